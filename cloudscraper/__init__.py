@@ -62,7 +62,7 @@ except ImportError:
     AsyncCloudScraper = None
     create_async_scraper = None
 from .performance import PerformanceMonitor, PerformanceProfiler
-from .challenge_response_system import ChallengeResponseSystem
+from .challenge_response_system import ChallengeResponseSystem, CHALLENGE_RESPONSE_RE
 from .tls_fingerprinting import TLSFingerprintingManager
 from .anti_detection import AntiDetectionManager
 from .cloudflare_v3 import CloudflareV3
@@ -1362,16 +1362,7 @@ class CloudScraperMixin(object):
         if response.status_code != 403:
             return False
 
-        challenge_indicators = [
-            'Just a moment...',
-            'Checking your browser',
-            'window._cf_chl_opt',
-            'challenge-platform',
-            'cf-mitigated'
-        ]
-
-        content_lower = response.text.lower()
-        return any(indicator.lower() in content_lower for indicator in challenge_indicators)
+        return CHALLENGE_RESPONSE_RE.search(response.text) is not None
 
     # ------------------------------------------------------------------------------- #
 
@@ -1561,7 +1552,7 @@ class CloudScraperMixin(object):
                 # Fallback to basic stats if method doesn't exist
                 stats['ml_optimization'] = {
                     'enabled': getattr(self.ml_optimizer, 'enabled', True),
-                    'total_attempts': len(getattr(self.ml_optimizer, 'optimizer', {}).get('attempt_history', [])) if hasattr(self.ml_optimizer, 'optimizer') else 0
+                    'total_attempts': len(getattr(getattr(self.ml_optimizer, 'optimizer', None), 'attempts', ()))
                 }
         
         # Enhanced error handling stats
@@ -19,6 +19,20 @@ from .js_challenge_solver import CloudflareChallengeSolver, JavaScriptEngine
 from .advanced_fingerprinting import AdvancedFingerprinter
 from .challenge_analyzer import ChallengeAnalyzer
 
+# Markers of a Cloudflare challenge page in a 403 body, as one
+# case-insensitive alternation so the body is scanned once and never
+# lowercased into a copy first
+CHALLENGE_RESPONSE_RE = re.compile(
+    '|'.join(re.escape(indicator) for indicator in (
+        'Just a moment...',
+        'Checking your browser',
+        'window._cf_chl_opt',
+        'challenge-platform',
+        'cf-mitigated'
+    )),
+    re.IGNORECASE
+)
+
 
 class ChallengeResponseSystem:
     """Complete system for handling Cloudflare challenge responses"""
@@ -68,16 +82,7 @@ class ChallengeResponseSystem:
         if response.status_code != 403:
             return False
         
-        challenge_indicators = [
-            'Just a moment...',
-            'Checking your browser',
-            'window._cf_chl_opt',
-            'challenge-platform',
-            'cf-mitigated'
-        ]
-        
-        content_lower = response.text.lower()
-        return any(indicator.lower() in content_lower for indicator in challenge_indicators)
+        return CHALLENGE_RESPONSE_RE.search(response.text) is not None
     
     def _handle_managed_challenge(self, response: requests.Response, challenge, strategy: Dict[str, Any]) -> Optional[requests.Response]:
         """Handle Cloudflare Managed Challenge v3"""
@@ -9,15 +9,77 @@ generation for various Cloudflare protection mechanisms.
 import re
 import json
 import time
+import sys
 import random
 import hashlib
 import base64
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from enum import IntEnum
 from typing import Dict, List, Any, Optional, Tuple, Callable
-from collections import defaultdict, deque
+from collections import defaultdict, deque, namedtuple
 from urllib.parse import urlparse, urljoin
 import logging
 
 
+class ResponseStrategy(IntEnum):
+    """Response strategies, numbered by their slot in the dispatch tuple"""
+    JS_EXECUTION = 0
+    ADVANCED_JS_EXECUTION = 1
+    BROWSER_SIMULATION = 2
+    CAPTCHA_SOLVING = 3
+    DELAY_RETRY = 4
+    PROXY_ROTATION = 5
+    ENHANCED_EVASION = 6
+
+
+STRATEGY_IDS = {strategy.name.lower(): strategy for strategy in ResponseStrategy}
+
+CLOUDFLARE_BODY_KEYWORDS = (b'just a moment...', b'window._cf_chl_opt', b'cf-browser-verification')
+
+RATE_LIMIT_TIME_RE = re.compile(rb'(\d+)\s*(second|minute|hour)', re.IGNORECASE)
+
+# URLs longer than this are stored as-is rather than interned
+MAX_INTERNED_URL_LENGTH = 2048
+
+# Known problematic domains registered as adaptive patterns in high-success mode
+DOMAIN_PATTERNS = {
+    'httpbin.org': {
+        'name': 'HTTPBin Rate Limit Protection',
+        'patterns': [
+            r'Rate limit exceeded',
+            r'Too many requests',
+            r'429.*Too Many Requests'
+        ],
+        'challenge_type': 'rate_limit',
+        'response_strategy': 'delay_retry'
+    },
+    'reddit.com': {
+        'name': 'Reddit Enhanced Protection',
+        'patterns': [
+            r'window\._cf_chl_opt\s*=.*?reddit',
+            r'reddit.*challenge-platform'
+        ],
+        'challenge_type': 'enhanced_protection',
+        'response_strategy': 'browser_simulation'
+    }
+}
+
+# Entry in the detection history ring buffer
+DetectionRecord = namedtuple('DetectionRecord', ['timestamp', 'pattern_id', 'confidence', 'url'])
+
+
+class SuccessStats:
+    """Per-pattern attempt/success counters"""
+    __slots__ = ('attempts', 'successes', 'recent_failures')
+
+    def __init__(self):
+        self.attempts = 0
+        self.successes = 0
+        self.recent_failures = 0
+
+
 class ChallengePattern:
     """Represents a challenge pattern with metadata"""
     
@@ -25,12 +87,28 @@ class ChallengePattern:
                  confidence: float, response_strategy: str):
         self.name = name
         self.patterns = patterns
+        # Matched against the raw response body, so compile in bytes mode
+        self.compiled = [
+            re.compile(p.encode('utf-8'), re.IGNORECASE | re.DOTALL) for p in patterns
+        ]
         self.challenge_type = challenge_type
         self.confidence = confidence
         self.response_strategy = response_strategy
+        self.strategy_id = STRATEGY_IDS.get(response_strategy)
         self.detection_count = 0
         self.success_rate = 0.0
         self.last_seen = 0
+        self._aggressive_tuned = False
+
+    @property
+    def confidence(self) -> float:
+        return self._confidence
+
+    @confidence.setter
+    def confidence(self, value: float):
+        # Keep the per-match weight in step so scoring needs no division
+        self._confidence = value
+        self._inv_total = value / (len(self.compiled) or 1)
 
 
 class IntelligentChallengeDetector:
@@ -39,8 +117,12 @@ class IntelligentChallengeDetector:
     def __init__(self):
         self.known_patterns = self._initialize_patterns()
         self.adaptive_patterns = {}
+        self._has_adaptive = False
         self.detection_history = deque(maxlen=1000)
-        self.success_tracking = defaultdict(lambda: {'attempts': 0, 'successes': 0})
+        self.success_tracking = defaultdict(SuccessStats)
+        # detect_challenge runs on the batch worker pool, so guard the
+        # shared history and pattern counters it updates
+        self._record_lock = threading.Lock()
         
     def _initialize_patterns(self) -> Dict[str, ChallengePattern]:
         """Initialize known challenge patterns"""
@@ -145,18 +227,20 @@ class IntelligentChallengeDetector:
         
         return patterns
     
-    def detect_challenge(self, response_text: str, response_headers: Dict[str, str], 
+    def detect_challenge(self, response_content: bytes, response_headers: Dict[str, str], 
                         status_code: int, url: str, debug: bool = False) -> Optional[Dict[str, Any]]:
-        """Detect challenge type from response"""
+        """Detect challenge type from the raw (undecoded) response body"""
+        if isinstance(response_content, str):
+            response_content = response_content.encode('utf-8', 'ignore')
+        
         # Check for Cloudflare indicators (Server header, CF-Ray, or keywords in body)
         headers_lower = {k.lower(): v.lower() for k, v in response_headers.items()}
         server = headers_lower.get('server', '')
         is_cloudflare = 'cloudflare' in server or 'cf-ray' in headers_lower
         
         if not is_cloudflare:
-            text_lower = response_text.lower()
-            cloudflare_keywords = ['just a moment...', 'window._cf_chl_opt', 'cf-browser-verification']
-            if any(kw in text_lower for kw in cloudflare_keywords):
+            content_lower = response_content.lower()
+            if any(kw in content_lower for kw in CLOUDFLARE_BODY_KEYWORDS):
                 is_cloudflare = True
 
         if not is_cloudflare:
@@ -172,7 +256,7 @@ class IntelligentChallengeDetector:
         
         # Check against known patterns
         for pattern_id, pattern in self.known_patterns.items():
-            confidence = self._calculate_pattern_confidence(response_text, pattern)
+            confidence = self._calculate_pattern_confidence(response_content, pattern)
             
             if confidence > 0.5 and confidence > max_confidence:
                 max_confidence = confidence
@@ -182,13 +266,15 @@ class IntelligentChallengeDetector:
                     'challenge_type': pattern.challenge_type,
                     'confidence': confidence,
                     'response_strategy': pattern.response_strategy,
+                    'strategy_id': pattern.strategy_id,
                     'url': url
                 }
         
-        # Check adaptive patterns
-        adaptive_result = self._check_adaptive_patterns(response_text, url)
-        if adaptive_result and adaptive_result['confidence'] > max_confidence:
-            detection_result = adaptive_result
+        # Check adaptive patterns (skipped entirely until one is registered)
+        if self._has_adaptive:
+            adaptive_result = self._check_adaptive_patterns(response_content, url)
+            if adaptive_result and adaptive_result['confidence'] > max_confidence:
+                detection_result = adaptive_result
         
         # Fallback for 403/503 from Cloudflare that might be challenges
         if not detection_result and status_code in [403, 503]:
@@ -198,6 +284,7 @@ class IntelligentChallengeDetector:
                 'challenge_type': 'managed',
                 'confidence': 0.7,
                 'response_strategy': 'browser_simulation',
+                'strategy_id': ResponseStrategy.BROWSER_SIMULATION,
                 'status_code': status_code,
                 'url': url
             }
@@ -208,32 +295,32 @@ class IntelligentChallengeDetector:
             
         return detection_result
     
-    def _calculate_pattern_confidence(self, text: str, pattern: ChallengePattern) -> float:
+    def _calculate_pattern_confidence(self, content: bytes, pattern: ChallengePattern) -> float:
         """Calculate confidence score for a pattern match"""
-        matches = 0
-        total_patterns = len(pattern.patterns)
-        
-        for regex_pattern in pattern.patterns:
-            if re.search(regex_pattern, text, re.IGNORECASE | re.DOTALL):
-                matches += 1
+        mask = 0
+        for i, compiled_pattern in enumerate(pattern.compiled):
+            if compiled_pattern.search(content):
+                mask |= 1 << i
         
         # Base confidence from pattern matching
-        base_confidence = (matches / total_patterns) * pattern.confidence
+        base_confidence = bin(mask).count('1') * pattern._inv_total
         
         # Adjust based on historical success rate
-        if pattern.detection_count > 0:
-            success_adjustment = pattern.success_rate * 0.1
-            base_confidence += success_adjustment
+        if pattern.detection_count:
+            base_confidence += pattern.success_rate * 0.1
         
-        return min(base_confidence, 1.0)
+        return base_confidence if base_confidence < 1.0 else 1.0
     
-    def _check_adaptive_patterns(self, text: str, url: str) -> Optional[Dict[str, Any]]:
+    def _check_adaptive_patterns(self, content: bytes, url: str) -> Optional[Dict[str, Any]]:
         """Check against learned adaptive patterns"""
+        if not self.adaptive_patterns:
+            return None
+        
         domain = urlparse(url).netloc
         
         if domain in self.adaptive_patterns:
             for pattern_id, pattern in self.adaptive_patterns[domain].items():
-                confidence = self._calculate_pattern_confidence(text, pattern)
+                confidence = self._calculate_pattern_confidence(content, pattern)
                 if confidence > 0.6:
                     return {
                         'pattern_id': pattern_id,
@@ -241,6 +328,7 @@ class IntelligentChallengeDetector:
                         'challenge_type': pattern.challenge_type,
                         'confidence': confidence,
                         'response_strategy': pattern.response_strategy,
+                        'strategy_id': pattern.strategy_id,
                         'adaptive': True
                     }
         
@@ -248,30 +336,40 @@ class IntelligentChallengeDetector:
     
     def _record_detection(self, detection: Dict[str, Any]):
         """Record detection for learning purposes"""
-        self.detection_history.append({
-            'timestamp': time.time(),
-            'pattern_id': detection['pattern_id'],
-            'confidence': detection['confidence'],
-            'url': detection['url']
-        })
-        
-        # Update pattern statistics
+        # Scrapers revisit the same URLs, so share one string object per URL
+        url = detection.get('url') or ''
+        if len(url) <= MAX_INTERNED_URL_LENGTH:
+            url = sys.intern(url)
+        
+        now = time.time()
         pattern_id = detection['pattern_id']
-        if pattern_id in self.known_patterns:
-            self.known_patterns[pattern_id].detection_count += 1
-            self.known_patterns[pattern_id].last_seen = time.time()
+        record = DetectionRecord(
+            timestamp=now,
+            pattern_id=pattern_id,
+            confidence=detection['confidence'],
+            url=url
+        )
+        
+        with self._record_lock:
+            self.detection_history.append(record)
+            
+            # Update pattern statistics
+            pattern = self.known_patterns.get(pattern_id)
+            if pattern is not None:
+                pattern.detection_count += 1
+                pattern.last_seen = now
     
     def learn_from_success(self, pattern_id: str, success: bool):
         """Learn from challenge response success/failure"""
         tracking = self.success_tracking[pattern_id]
-        tracking['attempts'] += 1
+        tracking.attempts += 1
         if success:
-            tracking['successes'] += 1
+            tracking.successes += 1
         
         # Update pattern success rate
         if pattern_id in self.known_patterns:
             pattern = self.known_patterns[pattern_id]
-            pattern.success_rate = tracking['successes'] / tracking['attempts']
+            pattern.success_rate = tracking.successes / tracking.attempts
     
     def add_adaptive_pattern(self, domain: str, pattern_name: str, 
                            patterns: List[str], challenge_type: str, 
@@ -288,6 +386,7 @@ class IntelligentChallengeDetector:
             confidence=0.8,  # Start with moderate confidence
             response_strategy=response_strategy
         )
+        self._has_adaptive = True
         
         logging.info(f"Added adaptive pattern for {domain}: {pattern_name}")
 
@@ -297,27 +396,31 @@ class ChallengeResponseGenerator:
     
     def __init__(self, cloudscraper):
         self.cloudscraper = cloudscraper
-        self.response_strategies = {
-            'js_execution': self._handle_js_execution,
-            'advanced_js_execution': self._handle_advanced_js_execution,
-            'browser_simulation': self._handle_browser_simulation,
-            'captcha_solving': self._handle_captcha_solving,
-            'delay_retry': self._handle_delay_retry,
-            'proxy_rotation': self._handle_proxy_rotation,
-            'enhanced_evasion': self._handle_enhanced_evasion
-        }
+        # Handlers bound once, indexed by ResponseStrategy
+        self._strategy_dispatch = (
+            self._handle_js_execution,
+            self._handle_advanced_js_execution,
+            self._handle_browser_simulation,
+            self._handle_captcha_solving,
+            self._handle_delay_retry,
+            self._handle_proxy_rotation,
+            self._handle_enhanced_evasion
+        )
         
     def generate_response(self, challenge_info: Dict[str, Any], 
                          response, **kwargs) -> Optional[Any]:
         """Generate response to detected challenge"""
         strategy = challenge_info.get('response_strategy')
+        strategy_id = challenge_info.get('strategy_id')
+        if strategy_id is None:
+            strategy_id = STRATEGY_IDS.get(strategy)
         
-        if strategy not in self.response_strategies:
+        if strategy_id is None:
             logging.warning(f"Unknown response strategy: {strategy}")
             return None
         
         try:
-            return self.response_strategies[strategy](challenge_info, response, **kwargs)
+            return self._strategy_dispatch[strategy_id](challenge_info, response, **kwargs)
         except Exception as e:
             logging.error(f"Error generating response for {strategy}: {e}")
             return None
@@ -458,12 +561,13 @@ class ChallengeResponseGenerator:
                 info[header.lower()] = value
         
         # Parse HTML for rate limit details
-        if 'rate limited' in response.text.lower():
+        content = response.content
+        if b'rate limited' in content.lower():
             # Try to extract time information
-            time_match = re.search(r'(\d+)\s*(second|minute|hour)', response.text, re.IGNORECASE)
+            time_match = RATE_LIMIT_TIME_RE.search(content)
             if time_match:
                 amount = int(time_match.group(1))
-                unit = time_match.group(2).lower()
+                unit = time_match.group(2).lower().decode('ascii')
                 multiplier = {'second': 1, 'minute': 60, 'hour': 3600}
                 info['extracted_delay'] = amount * multiplier.get(unit, 1)
         
@@ -498,12 +602,12 @@ class ChallengeResponseGenerator:
 
     def _configure_for_high_success(self):
         """Configure response generator for maximum success rate"""
-        # Add enhanced response strategies for high success
-        self.response_strategies.update({
-            'advanced_js_execution': self._handle_advanced_js_execution_enhanced,
-            'browser_simulation': self._handle_browser_simulation_enhanced,
-            'captcha_solving': self._handle_captcha_solving_enhanced
-        })
+        # Swap in enhanced response strategies for high success
+        dispatch = list(self._strategy_dispatch)
+        dispatch[ResponseStrategy.ADVANCED_JS_EXECUTION] = self._handle_advanced_js_execution_enhanced
+        dispatch[ResponseStrategy.BROWSER_SIMULATION] = self._handle_browser_simulation_enhanced
+        dispatch[ResponseStrategy.CAPTCHA_SOLVING] = self._handle_captcha_solving_enhanced
+        self._strategy_dispatch = tuple(dispatch)
 
         # Enable fallback strategies
         self._enable_fallback_strategies()
@@ -563,8 +667,10 @@ class ChallengeResponseGenerator:
 class IntelligentChallengeSystem:
     """Main intelligent challenge system coordinator"""
     
-    def __init__(self, cloudscraper):
+    def __init__(self, cloudscraper, max_detection_workers: int = 4):
         self.cloudscraper = cloudscraper
+        self.max_detection_workers = max_detection_workers
+        self._detection_executor = None
         self.detector = IntelligentChallengeDetector()
         self.response_generator = ChallengeResponseGenerator(cloudscraper)
         self.challenge_cache = {}
@@ -575,19 +681,65 @@ class IntelligentChallengeSystem:
             'average_solve_time': 0.0
         }
         
-    def process_response(self, response, **kwargs) -> Tuple[bool, Optional[Any]]:
-        """Process response and handle any detected challenges"""
-        start_time = time.time()
-        
-        # Detect challenge
-        challenge_info = self.detector.detect_challenge(
-            response.text, 
+    def _detect(self, response) -> Optional[Dict[str, Any]]:
+        """Run challenge detection for a single response"""
+        return self.detector.detect_challenge(
+            response.content, 
             dict(response.headers), 
             response.status_code, 
             response.url,
             debug=self.cloudscraper.debug
         )
+    
+    def _get_detection_executor(self) -> ThreadPoolExecutor:
+        """Lazily create the shared detection worker pool"""
+        if self._detection_executor is None:
+            self._detection_executor = ThreadPoolExecutor(
+                max_workers=self.max_detection_workers,
+                thread_name_prefix='cs-challenge-detect'
+            )
+        return self._detection_executor
+    
+    def process_response(self, response, **kwargs) -> Tuple[bool, Optional[Any]]:
+        """Process response and handle any detected challenges"""
+        start_time = time.time()
         
+        # Detect challenge
+        challenge_info = self._detect(response)
+        return self._handle_detection(challenge_info, response, start_time, **kwargs)
+    
+    def process_responses(self, responses: List[Any], **kwargs) -> List[Tuple[bool, Optional[Any]]]:
+        """
+        Process a batch of responses.
+        
+        Detection runs on the worker pool, which overlaps it with any I/O the
+        calling thread does; pattern scanning itself still holds the GIL.
+        Detection statistics are recorded under a lock, and challenge
+        handling then runs in order on the calling thread.
+        """
+        detections = list(self._get_detection_executor().map(self._detect, responses))
+        
+        # Each response is timed on its own, so its solve time does not
+        # include handling the responses before it
+        return [
+            self._handle_detection(challenge_info, response, time.time(), **kwargs)
+            for challenge_info, response in zip(detections, responses)
+        ]
+    
+    async def detect_challenge_async(self, response) -> Optional[Dict[str, Any]]:
+        """Detect challenge for a response without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_detection_executor(), self._detect, response)
+    
+    def shutdown(self):
+        """Stop the detection worker pool"""
+        if self._detection_executor is not None:
+            self._detection_executor.shutdown(wait=True)
+            self._detection_executor = None
+    
+    def _handle_detection(self, challenge_info: Optional[Dict[str, Any]], response,
+                          start_time: float, **kwargs) -> Tuple[bool, Optional[Any]]:
+        """Handle the result of challenge detection for one response"""
         if not challenge_info:
             return False, None  # No challenge detected
         
@@ -735,39 +887,19 @@ class IntelligentChallengeSystem:
         # Increase detection history size for better learning
         self.detector.detection_history = deque(maxlen=2000)
 
-        # Set higher confidence thresholds for pattern matching
+        # Set higher confidence thresholds for pattern matching (once per pattern)
         for pattern in self.detector.known_patterns.values():
-            pattern.confidence = min(pattern.confidence * 1.1, 0.99)
+            if not pattern._aggressive_tuned:
+                pattern.confidence = min(pattern.confidence * 1.1, 0.99)
+                pattern._aggressive_tuned = True
 
         # Enable faster learning from successes/failures
-        self.detector.success_tracking = defaultdict(lambda: {'attempts': 0, 'successes': 0, 'recent_failures': 0})
+        self.detector.success_tracking = defaultdict(SuccessStats)
 
     def _enable_domain_optimizations(self):
         """Enable domain-specific optimizations"""
         # Add known problematic domains with custom patterns
-        domain_patterns = {
-            'httpbin.org': {
-                'name': 'HTTPBin Rate Limit Protection',
-                'patterns': [
-                    r'Rate limit exceeded',
-                    r'Too many requests',
-                    r'429.*Too Many Requests'
-                ],
-                'challenge_type': 'rate_limit',
-                'response_strategy': 'delay_retry'
-            },
-            'reddit.com': {
-                'name': 'Reddit Enhanced Protection',
-                'patterns': [
-                    r'window\._cf_chl_opt\s*=.*?reddit',
-                    r'reddit.*challenge-platform'
-                ],
-                'challenge_type': 'enhanced_protection',
-                'response_strategy': 'browser_simulation'
-            }
-        }
-
-        for domain, config in domain_patterns.items():
+        for domain, config in DOMAIN_PATTERNS.items():
             self.detector.add_adaptive_pattern(
                 domain,
                 config['name'],
@@ -1,18 +1,8 @@
-import base64
-import subprocess
 import sys
 
 from . import JavaScriptInterpreter
 from .encapsulated import template
-
-# ------------------------------------------------------------------------------- #
-# Windows-specific flag to hide console window when spawning Node.js
-# This prevents console flash in PyInstaller --noconsole builds
-# ------------------------------------------------------------------------------- #
-
-_SUBPROCESS_FLAGS = 0
-if sys.platform == 'win32':
-    _SUBPROCESS_FLAGS = subprocess.CREATE_NO_WINDOW
+from ..node_worker import get_worker_pool
 
 # ------------------------------------------------------------------------------- #
 
@@ -28,15 +18,13 @@ class ChallengeInterpreter(JavaScriptInterpreter):
 
     def eval(self, body, domain):
         try:
-            js = 'var atob = function(str) {return Buffer.from(str, "base64").toString("binary");};' \
-                 'var challenge = atob("%s");' \
-                 'var context = {atob: atob};' \
-                 'var options = {filename: "iuam-challenge.js", timeout: 4000};' \
-                 'var answer = require("vm").runInNewContext(challenge, context, options);' \
-                 'process.stdout.write(String(answer));' \
-                 % base64.b64encode(template(body, domain).encode('UTF-8')).decode('ascii')
-
-            return subprocess.check_output(['node', '-e', js], creationflags=_SUBPROCESS_FLAGS)
+            # Runs in a fresh vm context (with atob) on a persistent Node.js worker
+            return get_worker_pool().evaluate(
+                template(body, domain),
+                timeout=4,
+                filename='iuam-challenge.js',
+                stringify=True
+            )
 
         except OSError as e:
             if e.errno == 2:
@@ -6,41 +6,238 @@ This module provides JavaScript execution capabilities to solve
 Cloudflare challenges that require browser-like JavaScript execution.
 """
 
-import os
+import re
 import json
+import functools
+import operator
 import subprocess
-import sys
-import tempfile
 import time
 import hashlib
 import random
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Any, Optional, List, Tuple
 from urllib.parse import urlparse, urljoin
 import requests
 
-# Windows-specific flag to hide console window when spawning Node.js
-# This prevents console flash in PyInstaller --noconsole builds
-_SUBPROCESS_FLAGS = 0
-if sys.platform == 'win32':
-    _SUBPROCESS_FLAGS = subprocess.CREATE_NO_WINDOW
+from .exceptions import ChallengeTimeoutError, InterpreterError
+from .node_worker import NODE_POPEN_KWARGS, get_worker_pool
+
+# ParseResult is immutable, and the same challenge URL is often re-solved
+_parse_url = functools.lru_cache(maxsize=256)(urlparse)
+
+
+@functools.lru_cache(maxsize=1)
+def _node_available() -> bool:
+    """Check once per process whether Node.js is available"""
+    try:
+        result = subprocess.run(['node', '--version'], 
+                              capture_output=True, text=True, timeout=5,
+                              **NODE_POPEN_KWARGS)
+        return result.returncode == 0
+    except (subprocess.TimeoutExpired, FileNotFoundError):
+        return False
+
+
+_TIMEOUT_RESULT = {
+    'success': False,
+    'data': None,
+    'error': 'JavaScript execution timeout'
+}
+
+
+def _parse_node_output(returncode: int, stdout: bytes, stderr: bytes) -> Dict[str, Any]:
+    """Turn the output of a one-shot node run into a result dict"""
+    if returncode == 0:
+        try:
+            return json.loads(stdout.strip())
+        except ValueError:
+            return {
+                'success': False,
+                'data': None,
+                'error': f"Invalid JSON output: {stdout.decode('utf-8', 'replace')}"
+            }
+    
+    return {
+        'success': False,
+        'data': None,
+        'error': stderr.decode('utf-8', 'replace')
+    }
+
+
+# Browser-like environment prepended to every executed script
+_BROWSER_ENV = """
+// Browser-like environment simulation
+var window = {};
+var document = {
+    createElement: function(tag) {
+        return {
+            src: '',
+            onload: null,
+            setAttribute: function() {},
+            getAttribute: function() { return ''; }
+        };
+    },
+    getElementsByTagName: function(tag) {
+        return [{
+            appendChild: function() {}
+        }];
+    },
+    location: {
+        href: '',
+        pathname: '',
+        search: '',
+        hash: ''
+    }
+};
+
+var location = document.location;
+var history = {
+    replaceState: function() {}
+};
+
+// Canvas and WebGL simulation
+var HTMLCanvasElement = function() {
+    this.getContext = function(type) {
+        if (type === '2d') {
+            return {
+                fillText: function() {},
+                getImageData: function() {
+                    return { data: new Array(1000).fill(0) };
+                }
+            };
+        } else if (type === 'webgl' || type === 'experimental-webgl') {
+            return {
+                getParameter: function(param) {
+                    return 'WebGL 1.0 (OpenGL ES 2.0 Chromium)';
+                },
+                getSupportedExtensions: function() {
+                    return ['WEBKIT_EXT_texture_filter_anisotropic'];
+                }
+            };
+        }
+        return null;
+    };
+};
+
+// Timing functions
+var performance = {
+    now: function() {
+        return Date.now();
+    }
+};
+
+// Navigator simulation
+var navigator = {
+    userAgent: 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    platform: 'Win32',
+    language: 'en-US',
+    languages: ['en-US', 'en'],
+    hardwareConcurrency: 8,
+    deviceMemory: 8
+};
+
+// Screen simulation
+var screen = {
+    width: 1920,
+    height: 1080,
+    availWidth: 1920,
+    availHeight: 1040,
+    colorDepth: 24,
+    pixelDepth: 24
+};
+
+// Console for debugging
+var console = {
+    log: function() {}
+};
+"""
+
+# Prints the result object when appended to a standalone node script. Written
+# with process.stdout because _BROWSER_ENV replaces console with a no-op.
+_RESULT_TAIL = """
+// Extract results
+try {
+process.stdout.write(JSON.stringify({success: true, data: typeof window !== 'undefined' ? window._cf_chl_result : null, error: null}));
+} catch (e) {
+process.stdout.write(JSON.stringify({success: false, data: null, error: e.toString()}));
+}
+"""
+
+# Evaluates to the result object when run as the last statement in a vm
+# context. The leading semicolon ends the caller's last statement, which may
+# lack one, so the IIFE is not parsed as a call on its value.
+_RESULT_EXPRESSION = """
+;
+// Extract results
+(function() {
+    try {
+        return {
+            success: true,
+            data: typeof window !== 'undefined' ? window._cf_chl_result : null,
+            error: null
+        };
+    } catch (e) {
+        return {
+            success: false,
+            data: null,
+            error: e.toString()
+        };
+    }
+})();
+"""
+
+# Appended to fetched challenge scripts to capture the solved state
+_CAPTURE_RESULT = """
+
+// Capture challenge result
+if (typeof window !== 'undefined' && window._cf_chl_opt) {
+    window._cf_chl_result = {
+        params: window._cf_chl_opt,
+        timestamp: Date.now(),
+        solved: true
+    };
+}
+"""
+
+# Downloads challenge scripts while the JavaScript side is being prepared
+_FETCH_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix='cs-challenge-fetch')
+
+# Challenge parsing patterns, compiled once at import
+_CF_CHL_OPT_RE = re.compile(r'window\._cf_chl_opt\s*=\s*\{([^}]+)\}')
+
+# All _cf_chl_opt parameters in one pass: single-quoted and double-quoted keys
+_PARAMS_RE = re.compile(
+    r"(?P<key>cvId|cZone|cType|cRay|cH|cFPWv|cITimeS|md):\s*'(?P<value>[^']+)'"
+    r'|(?P<dq_key>cUPMDTk|fa):\s*"(?P<dq_value>[^"]+)"'
+)
+
+_SCRIPT_URL_RES = [
+    re.compile(r"a\.src\s*=\s*'([^']+)'"),
+    re.compile(r'src\s*=\s*"([^"]*challenge-platform[^"]*)"')
+]
+
+_MATH_RE = re.compile(r'(\d+)\s*([+\-*/])\s*(\d+)')
+
+_MATH_OPERATIONS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': lambda a, b: a // b if b != 0 else 0
+}
+
+_ANSWER_RE = re.compile(
+    r'(?:jschl_answer|cf_ch_answer|answer)["\']?\s*:\s*["\']?([^"\']+)',
+    re.IGNORECASE
+)
 
 
 class JavaScriptEngine:
     """JavaScript execution engine using Node.js"""
     
-    def __init__(self, timeout: int = 30):
+    def __init__(self, timeout: int = 30, persistent: bool = True):
         self.timeout = timeout
-        self.node_available = self._check_node_availability()
-        
-    def _check_node_availability(self) -> bool:
-        """Check if Node.js is available"""
-        try:
-            result = subprocess.run(['node', '--version'], 
-                                  capture_output=True, text=True, timeout=5,
-                                  creationflags=_SUBPROCESS_FLAGS)
-            return result.returncode == 0
-        except (subprocess.TimeoutExpired, FileNotFoundError):
-            return False
+        self.persistent = persistent
+        self.node_available = _node_available()
     
     def execute_js(self, js_code: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """Execute JavaScript code and return the result"""
@@ -50,164 +247,106 @@ class JavaScriptEngine:
         # Prepare the execution context
         context = context or {}
         
-        # Create a temporary JavaScript file
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.js', delete=False) as f:
-            # Add browser-like environment
-            f.write(self._get_browser_environment())
-            
-            # Add context variables
-            for key, value in context.items():
-                f.write(f"var {key} = {json.dumps(value)};\n")
-            
-            # Add the challenge code
-            f.write(js_code)
-            
-            # Add result extraction
-            f.write("""
-            
-            // Extract results
-            try {
-                var result = {
-                    success: true,
-                    data: typeof window !== 'undefined' ? window._cf_chl_result : null,
-                    error: null
-                };
-                console.log(JSON.stringify(result));
-            } catch (e) {
-                console.log(JSON.stringify({
-                    success: false,
-                    data: null,
-                    error: e.toString()
-                }));
-            }
-            """)
-            
-            js_file = f.name
+        if self.persistent:
+            return self._execute_in_worker(js_code, context)
+        
+        # Assemble the script in memory and pipe it to node's stdin
+        script = ''.join([
+            _BROWSER_ENV,
+            *(f"var {key} = {json.dumps(value)};\n" for key, value in context.items()),
+            js_code,
+            _RESULT_TAIL
+        ])
         
         try:
             # Execute the JavaScript
-            result = subprocess.run(['node', js_file], 
-                                  capture_output=True, text=True, timeout=self.timeout,
-                                  creationflags=_SUBPROCESS_FLAGS)
-            
-            if result.returncode == 0:
-                try:
-                    return json.loads(result.stdout.strip())
-                except json.JSONDecodeError:
-                    return {
-                        'success': False,
-                        'data': None,
-                        'error': f'Invalid JSON output: {result.stdout}'
-                    }
-            else:
-                return {
-                    'success': False,
-                    'data': None,
-                    'error': result.stderr
-                }
-        
+            # Bytes in and out: node emits UTF-8 JSON, which json.loads reads directly
+            result = subprocess.run(['node', '-'], input=script.encode('utf-8'),
+                                  capture_output=True, check=False, timeout=self.timeout,
+                                  **NODE_POPEN_KWARGS)
         except subprocess.TimeoutExpired:
+            return _TIMEOUT_RESULT.copy()
+        
+        return _parse_node_output(result.returncode, result.stdout, result.stderr)
+    
+    def prepare_execution(self, context: Dict[str, Any] = None) -> 'PendingExecution':
+        """
+        Start the JavaScript side of an execution before the code is known.
+        
+        The worker pool is warmed up, or in one-shot mode node is spawned and
+        fed the environment and context; PendingExecution.complete() then
+        supplies the code.
+        """
+        if not self.node_available:
+            raise RuntimeError("Node.js is not available. Please install Node.js to use JavaScript challenge solving.")
+        
+        return PendingExecution(self, context or {})
+    
+    def _execute_in_worker(self, js_code: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Execute JavaScript on the persistent Node.js worker pool"""
+        script = ''.join([
+            _BROWSER_ENV,
+            *(f"var {key} = {json.dumps(value)};\n" for key, value in context.items()),
+            js_code,
+            _RESULT_EXPRESSION
+        ])
+        
+        try:
+            return get_worker_pool().evaluate(script, timeout=self.timeout)
+        except ChallengeTimeoutError:
+            return _TIMEOUT_RESULT.copy()
+        except InterpreterError as e:
             return {
                 'success': False,
                 'data': None,
-                'error': 'JavaScript execution timeout'
+                'error': str(e)
             }
-        
-        finally:
-            # Clean up temporary file
-            try:
-                os.unlink(js_file)
-            except OSError:
-                pass
     
     def _get_browser_environment(self) -> str:
         """Get browser-like JavaScript environment"""
-        return """
-        // Browser-like environment simulation
-        var window = {};
-        var document = {
-            createElement: function(tag) {
-                return {
-                    src: '',
-                    onload: null,
-                    setAttribute: function() {},
-                    getAttribute: function() { return ''; }
-                };
-            },
-            getElementsByTagName: function(tag) {
-                return [{
-                    appendChild: function() {}
-                }];
-            },
-            location: {
-                href: '',
-                pathname: '',
-                search: '',
-                hash: ''
-            }
-        };
-        
-        var location = document.location;
-        var history = {
-            replaceState: function() {}
-        };
-        
-        // Canvas and WebGL simulation
-        var HTMLCanvasElement = function() {
-            this.getContext = function(type) {
-                if (type === '2d') {
-                    return {
-                        fillText: function() {},
-                        getImageData: function() {
-                            return { data: new Array(1000).fill(0) };
-                        }
-                    };
-                } else if (type === 'webgl' || type === 'experimental-webgl') {
-                    return {
-                        getParameter: function(param) {
-                            return 'WebGL 1.0 (OpenGL ES 2.0 Chromium)';
-                        },
-                        getSupportedExtensions: function() {
-                            return ['WEBKIT_EXT_texture_filter_anisotropic'];
-                        }
-                    };
-                }
-                return null;
-            };
-        };
-        
-        // Timing functions
-        var performance = {
-            now: function() {
-                return Date.now();
-            }
-        };
-        
-        // Navigator simulation
-        var navigator = {
-            userAgent: 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            platform: 'Win32',
-            language: 'en-US',
-            languages: ['en-US', 'en'],
-            hardwareConcurrency: 8,
-            deviceMemory: 8
-        };
+        return _BROWSER_ENV
+
+
+class PendingExecution:
+    """A JavaScript execution whose environment is ready but whose code is not"""
+    
+    def __init__(self, engine: JavaScriptEngine, context: Dict[str, Any]):
+        self.engine = engine
+        self.context = context
+        self.process = None
+        
+        if engine.persistent:
+            get_worker_pool().start()
+            return
+        
+        self.process = subprocess.Popen(['node', '-'],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.PIPE,
+                                        **NODE_POPEN_KWARGS)
+        self.process.stdin.write(''.join([
+            _BROWSER_ENV,
+            *(f"var {key} = {json.dumps(value)};\n" for key, value in context.items())
+        ]).encode('utf-8'))
+    
+    def complete(self, js_code: str) -> Dict[str, Any]:
+        """Supply the code, run it and return the result"""
+        if self.process is None:
+            return self.engine._execute_in_worker(js_code, self.context)
         
-        // Screen simulation
-        var screen = {
-            width: 1920,
-            height: 1080,
-            availWidth: 1920,
-            availHeight: 1040,
-            colorDepth: 24,
-            pixelDepth: 24
-        };
+        try:
+            stdout, stderr = self.process.communicate((js_code + _RESULT_TAIL).encode('utf-8'),
+                                                      timeout=self.engine.timeout)
+        except subprocess.TimeoutExpired:
+            self.cancel()
+            return _TIMEOUT_RESULT.copy()
         
-        // Console for debugging
-        var console = {
-            log: function() {}
-        };
-        """
+        return _parse_node_output(self.process.returncode, stdout, stderr)
+    
+    def cancel(self):
+        """Abandon the execution"""
+        if self.process is not None and self.process.poll() is None:
+            self.process.kill()
+            self.process.communicate()
 
 
 class CloudflareChallengeSolver:
@@ -219,39 +358,51 @@ class CloudflareChallengeSolver:
         
     def solve_challenge(self, challenge_html: str, url: str) -> Optional[Dict[str, Any]]:
         """Solve a Cloudflare challenge"""
+        # Cheap rejection: the parameter block cannot match without this literal
+        if 'window._cf_chl_opt' not in challenge_html:
+            return None
+        
         # Extract challenge parameters
         challenge_params = self._extract_challenge_params(challenge_html)
         if not challenge_params:
             return None
         
+        parsed_url = _parse_url(url)
+        origin = f"{parsed_url.scheme}://{parsed_url.netloc}"
+        
         # Get challenge script
-        script_url = self._extract_script_url(challenge_html, url)
+        script_url = self._extract_script_url(challenge_html, origin)
         if not script_url:
             return None
         
-        # Fetch and execute challenge script
-        challenge_script = self._fetch_challenge_script(script_url)
-        if not challenge_script:
-            return None
+        # Fetch the challenge script while node gets ready
+        script_future = _FETCH_EXECUTOR.submit(self._fetch_challenge_script, script_url)
         
         # Prepare execution context
-        context = self._prepare_context(challenge_params, url)
+        context = self._prepare_context(challenge_params, url, parsed_url)
+        try:
+            pending = self.js_engine.prepare_execution(context)
+        except Exception:
+            script_future.cancel()
+            raise
+        
+        challenge_script = script_future.result()
+        if not challenge_script:
+            pending.cancel()
+            return None
         
         # Execute the challenge
-        result = self._execute_challenge(challenge_script, context)
+        result = pending.complete(challenge_script + _CAPTURE_RESULT)
         
         if result and result.get('success'):
-            return self._format_solution(result, challenge_params, url)
+            return self._format_solution(result, challenge_params, url, origin)
         
         return None
     
     def _extract_challenge_params(self, html: str) -> Optional[Dict[str, str]]:
         """Extract challenge parameters from HTML"""
-        import re
-        
         # Look for window._cf_chl_opt
-        pattern = r'window\._cf_chl_opt\s*=\s*\{([^}]+)\}'
-        match = re.search(pattern, html)
+        match = _CF_CHL_OPT_RE.search(html)
         
         if not match:
             return None
@@ -259,43 +410,27 @@ class CloudflareChallengeSolver:
         params_str = match.group(1)
         params = {}
         
-        # Extract individual parameters
-        param_patterns = {
-            'cvId': r"cvId:\s*'([^']+)'",
-            'cZone': r"cZone:\s*'([^']+)'",
-            'cType': r"cType:\s*'([^']+)'",
-            'cRay': r"cRay:\s*'([^']+)'",
-            'cH': r"cH:\s*'([^']+)'",
-            'cUPMDTk': r'cUPMDTk:\s*"([^"]+)"',
-            'cFPWv': r"cFPWv:\s*'([^']+)'",
-            'cITimeS': r"cITimeS:\s*'([^']+)'",
-            'fa': r'fa:\s*"([^"]+)"',
-            'md': r"md:\s*'([^']+)'"
-        }
-        
-        for key, pattern in param_patterns.items():
-            param_match = re.search(pattern, params_str)
-            if param_match:
-                params[key] = param_match.group(1)
+        # Extract individual parameters (first occurrence of each wins)
+        for param_match in _PARAMS_RE.finditer(params_str):
+            if param_match.group('key'):
+                params.setdefault(param_match.group('key'), param_match.group('value'))
+            else:
+                params.setdefault(param_match.group('dq_key'), param_match.group('dq_value'))
         
         return params if params else None
     
-    def _extract_script_url(self, html: str, base_url: str) -> Optional[str]:
+    def _extract_script_url(self, html: str, origin: str) -> Optional[str]:
         """Extract challenge script URL"""
-        import re
-        
-        patterns = [
-            r"a\.src\s*=\s*'([^']+)'",
-            r'src\s*=\s*"([^"]*challenge-platform[^"]*)"'
-        ]
+        # Each pattern requires one of these literals
+        if 'challenge-platform' not in html and 'a.src' not in html:
+            return None
         
-        for pattern in patterns:
-            match = re.search(pattern, html)
+        for pattern in _SCRIPT_URL_RES:
+            match = pattern.search(html)
             if match:
                 script_url = match.group(1)
                 if script_url.startswith('/'):
-                    parsed_url = urlparse(base_url)
-                    script_url = f"{parsed_url.scheme}://{parsed_url.netloc}{script_url}"
+                    script_url = f"{origin}{script_url}"
                 return script_url
         
         return None
@@ -311,10 +446,8 @@ class CloudflareChallengeSolver:
         
         return None
     
-    def _prepare_context(self, params: Dict[str, str], url: str) -> Dict[str, Any]:
+    def _prepare_context(self, params: Dict[str, str], url: str, parsed_url) -> Dict[str, Any]:
         """Prepare JavaScript execution context"""
-        parsed_url = urlparse(url)
-        
         return {
             '_cf_chl_opt': params,
             'location': {
@@ -331,39 +464,26 @@ class CloudflareChallengeSolver:
     def _execute_challenge(self, script: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """Execute the challenge script"""
         # Modify the script to capture results
-        modified_script = script + """
-        
-        // Capture challenge result
-        if (typeof window !== 'undefined' && window._cf_chl_opt) {
-            window._cf_chl_result = {
-                params: window._cf_chl_opt,
-                timestamp: Date.now(),
-                solved: true
-            };
-        }
-        """
-        
-        return self.js_engine.execute_js(modified_script, context)
+        return self.js_engine.execute_js(script + _CAPTURE_RESULT, context)
     
-    def _format_solution(self, result: Dict[str, Any], params: Dict[str, str], url: str) -> Dict[str, Any]:
+    def _format_solution(self, result: Dict[str, Any], params: Dict[str, str], url: str,
+                         origin: str) -> Dict[str, Any]:
         """Format the challenge solution"""
         return {
             'success': True,
             'challenge_type': params.get('cType', 'unknown'),
             'ray_id': params.get('cRay'),
             'solution_data': result.get('data'),
-            'submit_url': self._build_submit_url(params, url),
+            'submit_url': self._build_submit_url(params, url, origin),
             'headers': self._build_submit_headers(params),
             'form_data': self._build_form_data(params, result.get('data'))
         }
     
-    def _build_submit_url(self, params: Dict[str, str], base_url: str) -> str:
+    def _build_submit_url(self, params: Dict[str, str], base_url: str, origin: str) -> str:
         """Build the challenge submission URL"""
-        parsed_url = urlparse(base_url)
-        
         # Use the challenge token URL if available
         if 'cUPMDTk' in params:
-            return f"{parsed_url.scheme}://{parsed_url.netloc}{params['cUPMDTk']}"
+            return f"{origin}{params['cUPMDTk']}"
         
         return base_url
     
@@ -398,54 +518,18 @@ class CloudflareChallengeSolver:
 class FallbackChallengeSolver:
     """Fallback solver for when Node.js is not available"""
     
-    def __init__(self):
-        self.math_patterns = [
-            r'(\d+)\s*\+\s*(\d+)',
-            r'(\d+)\s*-\s*(\d+)',
-            r'(\d+)\s*\*\s*(\d+)',
-            r'(\d+)\s*/\s*(\d+)'
-        ]
-    
     def solve_simple_math_challenge(self, js_code: str) -> Optional[int]:
         """Solve simple mathematical challenges without Node.js"""
-        import re
-        
-        # Extract mathematical expressions
-        for pattern in self.math_patterns:
-            matches = re.findall(pattern, js_code)
-            if matches:
-                try:
-                    # Evaluate the first match
-                    a, b = map(int, matches[0])
-                    
-                    if '+' in pattern:
-                        return a + b
-                    elif '-' in pattern:
-                        return a - b
-                    elif '*' in pattern:
-                        return a * b
-                    elif '/' in pattern:
-                        return a // b if b != 0 else 0
-                        
-                except (ValueError, ZeroDivisionError):
-                    continue
+        # Evaluate the first binary expression in a single scan
+        match = _MATH_RE.search(js_code)
+        if not match:
+            return None
         
-        return None
+        a, op, b = int(match.group(1)), match.group(2), int(match.group(3))
+        return _MATH_OPERATIONS[op](a, b)
     
     def extract_challenge_answer(self, html: str) -> Optional[str]:
         """Extract pre-computed challenge answers from HTML"""
-        import re
-        
         # Look for common answer patterns
-        patterns = [
-            r'answer["\']?\s*:\s*["\']?([^"\']+)["\']?',
-            r'jschl_answer["\']?\s*:\s*["\']?([^"\']+)["\']?',
-            r'cf_ch_answer["\']?\s*:\s*["\']?([^"\']+)["\']?'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, html, re.IGNORECASE)
-            if match:
-                return match.group(1)
-        
-        return None
+        match = _ANSWER_RE.search(html)
+        return match.group(1) if match else None
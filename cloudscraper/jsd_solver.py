@@ -1,12 +1,14 @@
 import re
 import json
 import time
+import functools
 import requests
-from .lz_string_custom import CustomLZString
+from types import MappingProxyType
+from .lz_string_custom import CompressionState
 from .user_agent import User_Agent
 
 # Ported from constants.go
-BROWSER_CONFIGURATION = {
+BROWSER_CONFIGURATION = MappingProxyType({
     "0": [
         "length", "innerWidth", "innerHeight", "scrollX", "pageXOffset", "scrollY", "pageYOffset", 
         "screenX", "screenY", "screenLeft", "screenTop", "TEMPORARY", "n.maxTouchPoints"
@@ -68,17 +70,43 @@ BROWSER_CONFIGURATION = {
         "onmousewheel", "onpause", "onplay", "onplaying", "onprogress", "onratechange", "onreset", 
         "onresize", "onscroll", "onsecuritypolicyviolation", "onseeked", "onseeking"
     ]
-}
+})
+
+# Compact encoder shared by every solve
+_PAYLOAD_ENCODER = json.JSONEncoder(separators=(',', ':'))
+
+# The invariant part of every payload, serialized once without its outer braces
+_STATIC_PAYLOAD_JSON = _PAYLOAD_ENCODER.encode(dict(BROWSER_CONFIGURATION))[1:-1]
+
+# Every payload starts with this text; the per-solve fields follow it
+_PAYLOAD_PREFIX = '{' + _STATIC_PAYLOAD_JSON + ','
+
+
+@functools.lru_cache(maxsize=32)
+def _prefix_state(lz_key):
+    """Compressor state with the payload prefix already fed; snapshot() before use"""
+    state = CompressionState(lz_key)
+    state.feed(_PAYLOAD_PREFIX)
+    return state
+
 
 class JSDSolver:
+    # LZ keys are whole comma/whitespace-delimited tokens containing '$'. Splitting
+    # once and filtering replaces r'[^\s,]*\$[^\s,]*\+?[^\s,]*', whose adjacent
+    # unbounded classes backtrack badly on long tokens
+    _TOKEN_SPLIT_RE = re.compile(r'[\s,]+')
+    _S_KEY_RE = re.compile(r'\d+\.\d+:\d+:[^\s,]+')
+
     def __init__(self, user_agent=None):
         self.user_agent = user_agent
-        self.lz_key_regex = re.compile(r'[^\s,]*\$[^\s,]*\+?[^\s,]*')
-        self.s_key_regex = re.compile(r'\d+\.\d+:\d+:[^\s,]+')
 
     def parse_script(self, content):
-        found_lz_key = self.lz_key_regex.findall(content)
-        found_s_key = self.s_key_regex.findall(content)
+        # Every LZ key contains '$' and every secret key contains ':'
+        if '$' not in content or ':' not in content:
+            return None, None
+
+        found_lz_key = [token for token in self._TOKEN_SPLIT_RE.split(content) if '$' in token]
+        found_s_key = self._S_KEY_RE.findall(content)
 
         if len(found_lz_key) == 2 and len(found_s_key) == 2:
             lz_key = found_lz_key[1]
@@ -96,7 +124,7 @@ class JSDSolver:
         return None, None
 
     def build_payload(self, user_agent):
-        payload_data = BROWSER_CONFIGURATION.copy()
+        payload_data = dict(BROWSER_CONFIGURATION)
         payload_data["APPVERSION"] = user_agent.replace("Mozilla/", "")
         payload_data["USERAGENT"] = user_agent
         # This specific key format "MM/DD/YYYY HH:MM:SS" is from the reference repo
@@ -107,6 +135,19 @@ class JSDSolver:
         payload_data["06/26/2023 06:47:34"] = time.strftime("%m/%d/%Y %H:%M:%S")
         return payload_data
 
+    def build_payload_json(self, user_agent):
+        # Same document as json.dumps(self.build_payload(...)), but only the
+        # per-solve fields are serialized; the static configuration is spliced in
+        return _PAYLOAD_PREFIX + self._dynamic_payload_json(user_agent)
+
+    def _dynamic_payload_json(self, user_agent):
+        # The per-solve fields, serialized without their opening brace
+        return _PAYLOAD_ENCODER.encode({
+            "APPVERSION": user_agent.replace("Mozilla/", ""),
+            "USERAGENT": user_agent,
+            "06/26/2023 06:47:34": time.strftime("%m/%d/%Y %H:%M:%S")
+        })[1:]
+
     def solve(self, script_content, user_agent=None):
         if not user_agent:
             user_agent = self.user_agent
@@ -115,13 +156,13 @@ class JSDSolver:
         if not lz_key or not secret_key:
             raise ValueError("Could not parse keys from JSD script.")
 
-        payload_data = self.build_payload(user_agent)
-        payload_json = json.dumps(payload_data, separators=(',', ':')) # Minimize standard storage
-        
         # Compress
         # Reference: windowProperties, err := new(LZString).CompressToEncodedURIComponent(c.Payload, lzStringKey)
-        custom_lz = CustomLZString()
-        window_properties = custom_lz.compress_to_encoded_uri_component(payload_json, lz_key)
+        # The static prefix is compressed once per key and reused on retries;
+        # only the per-solve fields are fed to a copy of that state
+        state = _prefix_state(lz_key).snapshot()
+        state.feed(self._dynamic_payload_json(user_agent))
+        window_properties = state.finish()
         
         return {
             "wp": window_properties,
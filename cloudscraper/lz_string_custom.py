@@ -1,137 +1,225 @@
-import struct
+import sys
+from array import array
 
-class CustomLZString:
-    @staticmethod
-    def compress_to_encoded_uri_component(uncompressed, key):
-        if uncompressed is None:
-            return ""
-        # The key acts as the map for the 6-bit values. 
-        # key is a string argument, acting as the alphabet.
-        return CustomLZString._compress(uncompressed, 6, lambda i: key[i])
+UTF16_NATIVE = 'utf-16-le' if sys.byteorder == 'little' else 'utf-16-be'
 
-    @staticmethod
-    def _compress(uncompressed, bits_per_char, get_char_from_int):
-        if uncompressed is None:
-            return ""
+# Code units are 16 bits wide, so shifting a prefix id past them keeps
+# sequence keys distinct from single-unit keys and from each other
+PREFIX_SHIFT = 16
+
+# BITREV8[v] is v with its 8 bits in reverse order
+BITREV8 = tuple(int('{:08b}'.format(v)[::-1], 2) for v in range(256))
+
+
+class CompressionState:
+    """
+    Incremental LZString compressor.
 
-        # Convert input string to a list of UTF-16 code units (integers)
-        # to ensure compatibility with JS-based LZString implementations.
-        b = uncompressed.encode('utf-16-le')
-        # Format '<' is little-endian, 'H' is unsigned short (2 bytes)
-        uncompressed_units = struct.unpack(f'<{len(b)//2}H', b)
-
-        i = 0
-        context_dictionary = {}
-        context_dictionary_to_create = {}
-        context_c = ""
-        context_wc = ""
-        context_w = ""
-        context_enlarge_in = 2  # Compensate for the first slot check
-        context_dict_size = 3
-        context_num_bits = 2
-        
-        # Checks if key exists in dictionary. 
-        # Using string keys for dictionary to match standard LZString logic logic (chars or char sequences)
-        # But here our "chars" are integers (utf16 units).
-        # We will use string representation of the tuple/list for dict keys or just tuples.
-        
-        context_data = []
-        context_data_val = 0
-        context_data_position = 0
-
-        # Helper to append bits to output
-        def write_bit(val):
-            nonlocal context_data_val, context_data_position
-            context_data_val = (context_data_val << 1) | val
-            if context_data_position == bits_per_char - 1:
-                context_data_position = 0
-                context_data.append(get_char_from_int(context_data_val))
-                context_data_val = 0
+    Input can be fed in several pieces and finish() yields the same output
+    as compressing their concatenation in one go. snapshot() copies the
+    state, so a shared prefix (e.g. a fixed payload head reused across
+    challenge retries) is compressed once and each suffix is fed to a copy.
+    """
+
+    def __init__(self, key, bits_per_char=6, split_on=None):
+        self.key = key
+        self.bits_per_char = bits_per_char
+        self.split_on = split_on
+        self.char_mask = (1 << bits_per_char) - 1
+
+        # Dictionary keys are plain ints rather than tuples of code units:
+        # a single unit is its own key, and a longer sequence is keyed by
+        # the id of its prefix combined with the new unit. Every prefix is
+        # already in the dictionary, so this identifies the sequence uniquely
+        # and costs O(1) per step instead of building and hashing a tuple.
+        self.context_dictionary = {}
+        self.context_dictionary_to_create = set()
+        self.context_w_id = -1  # Dictionary id of the current sequence, -1 if empty
+        self.context_w_char = -1  # Its code unit when it is a single unit, else -1
+        self.context_enlarge_in = 2  # Compensate for the first slot check
+        self.context_dict_size = 3
+        self.context_num_bits = 2
+
+        # Output chars are appended as bytes to a bytearray and decoded once
+        # at the end, avoiding a one-char str per output char. The alphabet
+        # cloudscraper uses is ASCII; any other key falls back to a list.
+        if key.isascii():
+            self.alphabet = key.encode('ascii')
+            self.context_data = bytearray()
+        else:
+            self.alphabet = key
+            self.context_data = []
+        # Pending output bits, most recent in the low end, and their count
+        self.context_data_val = 0
+        self.context_data_bits = 0
+
+    def snapshot(self):
+        """Return an independent copy of this state"""
+        state = CompressionState.__new__(CompressionState)
+        state.__dict__.update(self.__dict__)
+        state.context_dictionary = self.context_dictionary.copy()
+        state.context_dictionary_to_create = self.context_dictionary_to_create.copy()
+        state.context_data = self.context_data.copy()
+        return state
+
+    def restore(self, snapshot):
+        """Reset this state to a copy of an earlier snapshot"""
+        self.__dict__.update(snapshot.snapshot().__dict__)
+
+    def _write_bits(self, num_bits, val):
+        # Append num_bits of val to the output, least significant bit first.
+        # The bits are reversed in one step with a lookup table and shifted
+        # into the accumulator, and whole output chars are then peeled off
+        # the top, so nothing here loops per bit.
+        data_val = self.context_data_val
+        data_bits = self.context_data_bits + num_bits
+        while num_bits > 16:
+            data_val = (data_val << 16) | (BITREV8[val & 0xFF] << 8) | BITREV8[(val >> 8) & 0xFF]
+            val >>= 16
+            num_bits -= 16
+        if num_bits > 8:
+            reversed_val = (BITREV8[val & 0xFF] << 8) | BITREV8[(val >> 8) & 0xFF]
+            data_val = (data_val << num_bits) | (reversed_val >> (16 - num_bits))
+        else:
+            data_val = (data_val << num_bits) | (BITREV8[val & 0xFF] >> (8 - num_bits))
+
+        bits_per_char = self.bits_per_char
+        if data_bits >= bits_per_char:
+            alphabet = self.alphabet
+            char_mask = self.char_mask
+            append = self.context_data.append
+            while data_bits >= bits_per_char:
+                data_bits -= bits_per_char
+                append(alphabet[(data_val >> data_bits) & char_mask])
+        self.context_data_val = data_val & ((1 << data_bits) - 1)
+        self.context_data_bits = data_bits
+
+    def _emit_w(self, w_id, w_char):
+        # Output the code for the current sequence w, given its dictionary
+        # id and, when it is a single unit, that unit. A unit seen for the
+        # first time is written out raw instead of by id.
+        num_bits = self.context_num_bits
+        enlarge_in = self.context_enlarge_in
+        if w_char in self.context_dictionary_to_create:
+            # The 0/1 width marker and the raw unit go out as one write,
+            # marker first since bits are emitted least significant first
+            if w_char < 256:
+                self._write_bits(num_bits + 8, w_char << num_bits)
             else:
-                context_data_position += 1
-
-        def write_bits(num_bits, val):
-             for _ in range(num_bits):
-                write_bit(val & 1)
-                val = val >> 1
-
-        for ii in range(len(uncompressed_units)):
-            context_c = uncompressed_units[ii]
-            # We use tuples as dictionary keys for sequences of chars
-            # Single char is tuple (c,)
-            context_c_key = (context_c,)
-            
-            if context_c_key not in context_dictionary:
-                context_dictionary[context_c_key] = context_dict_size
+                self._write_bits(num_bits + 16, (w_char << num_bits) | 1)
+            enlarge_in -= 1
+            if enlarge_in == 0:
+                enlarge_in = 2**num_bits
+                num_bits += 1
+            self.context_dictionary_to_create.discard(w_char)
+        else:
+            self._write_bits(num_bits, w_id)
+
+        enlarge_in -= 1
+        if enlarge_in == 0:
+            enlarge_in = 2**num_bits
+            num_bits += 1
+        self.context_num_bits = num_bits
+        self.context_enlarge_in = enlarge_in
+
+    def feed(self, uncompressed):
+        """Compress another piece of input"""
+        # Convert input string to UTF-16 code units (integers) to ensure
+        # compatibility with JS-based LZString implementations. The array
+        # holds them as native unsigned shorts rather than one int object
+        # per unit, so they are encoded in the host byte order.
+        uncompressed_units = array('H')
+        uncompressed_units.frombytes(uncompressed.encode(UTF16_NATIVE))
+
+        context_dictionary = self.context_dictionary
+        context_dictionary_to_create = self.context_dictionary_to_create
+        context_dict_size = self.context_dict_size
+        emit_w = self._emit_w
+        split_on = self.split_on
+        units = iter(uncompressed_units)
+
+        # The very first unit always starts the current sequence, so it is
+        # peeled off here and the loop below never has to test for an
+        # empty one
+        if self.context_w_id < 0:
+            for context_c in units:
+                context_dictionary[context_c] = context_dict_size
                 context_dict_size += 1
-                context_dictionary_to_create[context_c_key] = True
-            
-            # content_wc = context_w + context_c
-            # context_w is a string in JS, here a tuple of ints
-            if context_w == "":
-                context_wc_key = (context_c,)
-            else:
-                context_wc_key = context_w + (context_c,)
-            
-            if context_wc_key in context_dictionary:
-                context_w = context_wc_key
+                context_dictionary_to_create.add(context_c)
+                self.context_w_id = context_dictionary[context_c]
+                self.context_w_char = context_c
+                break
+
+        context_w_id = self.context_w_id
+        context_w_char = self.context_w_char
+        dictionary_get = context_dictionary.get
+        for context_c in units:
+            context_c_id = dictionary_get(context_c)
+            if context_c_id is None:
+                context_c_id = context_dictionary[context_c] = context_dict_size
+                context_dict_size += 1
+                context_dictionary_to_create.add(context_c)
+
+            context_wc_key = (context_w_id << PREFIX_SHIFT) | context_c
+            context_wc_id = dictionary_get(context_wc_key)
+            # Optionally end the current sequence at a delimiter unit (e.g.
+            # 0x2C for ',') so matches do not run across field boundaries.
+            # The forced emit adds an entry exactly like a miss does, so the
+            # dictionary stays in step with any standard decompressor.
+            if context_c == split_on:
+                context_wc_id = None
+            if context_wc_id is not None:
+                context_w_char = -1
+                context_w_id = context_wc_id
             else:
-                if context_w in context_dictionary_to_create:
-                    if context_w[0] < 256:
-                        write_bits(context_num_bits, 0)
-                        write_bits(8, context_w[0])
-                    else:
-                        write_bits(context_num_bits, 1)
-                        write_bits(16, context_w[0])
-                    context_enlarge_in -= 1
-                    if context_enlarge_in == 0:
-                        context_enlarge_in = 2**context_num_bits
-                        context_num_bits += 1
-                    del context_dictionary_to_create[context_w]
-                else:
-                    write_bits(context_num_bits, context_dictionary[context_w])
-                
-                context_enlarge_in -= 1
-                if context_enlarge_in == 0:
-                    context_enlarge_in = 2**context_num_bits
-                    context_num_bits += 1
-                
+                emit_w(context_w_id, context_w_char)
+
                 # Add wc to the dictionary.
                 context_dictionary[context_wc_key] = context_dict_size
                 context_dict_size += 1
-                context_w = (context_c,)
+                context_w_id = context_c_id
+                context_w_char = context_c
+
+        self.context_w_id = context_w_id
+        self.context_w_char = context_w_char
+        self.context_dict_size = context_dict_size
 
+    def finish(self):
+        """
+        Terminate the stream and return the compressed output.
+        The state is consumed; snapshot() first to keep feeding a copy.
+        """
         # Output the code for w
-        if context_w != "":
-            if context_w in context_dictionary_to_create:
-                if context_w[0] < 256:
-                    write_bits(context_num_bits, 0)
-                    write_bits(8, context_w[0])
-                else:
-                    write_bits(context_num_bits, 1)
-                    write_bits(16, context_w[0])
-                context_enlarge_in -= 1
-                if context_enlarge_in == 0:
-                    context_enlarge_in = 2**context_num_bits
-                    context_num_bits += 1
-                del context_dictionary_to_create[context_w]
-            else:
-                write_bits(context_num_bits, context_dictionary[context_w])
-            
-            context_enlarge_in -= 1
-            if context_enlarge_in == 0:
-                context_enlarge_in = 2**context_num_bits
-                context_num_bits += 1
+        if self.context_w_id >= 0:
+            self._emit_w(self.context_w_id, self.context_w_char)
 
         # Mark the end of the stream
-        write_bits(context_num_bits, 2)
+        self._write_bits(self.context_num_bits, 2)
 
-        # Flush the last char
-        while True:
-            context_data_val = (context_data_val << 1)
-            if context_data_position == bits_per_char - 1:
-                context_data.append(get_char_from_int(context_data_val))
-                break
-            context_data_position += 1
+        # Flush the last char, padding it with zero bits
+        self.context_data.append(
+            self.alphabet[(self.context_data_val << (self.bits_per_char - self.context_data_bits)) & self.char_mask]
+        )
+
+        if isinstance(self.context_data, bytearray):
+            return self.context_data.decode('ascii')
+        return "".join(self.context_data)
+
+
+class CustomLZString:
+    @staticmethod
+    def compress_to_encoded_uri_component(uncompressed, key, split_on=None):
+        if uncompressed is None:
+            return ""
+        # The key acts as the map for the 6-bit values.
+        # key is a string argument, acting as the alphabet.
+        return CustomLZString._compress(uncompressed, 6, key, split_on)
+
+    @staticmethod
+    def _compress(uncompressed, bits_per_char, key, split_on=None):
+        if uncompressed is None:
+            return ""
 
-        return "".join(context_data)
+        state = CompressionState(key, bits_per_char, split_on)
+        state.feed(uncompressed)
+        return state.finish()
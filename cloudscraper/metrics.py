@@ -3,30 +3,135 @@ Metrics collection and monitoring for CloudScraper
 """
 import time
 import threading
+import itertools
+from array import array
 from collections import defaultdict, deque
 from typing import Dict, Any, Optional, List
 import json
 
 
+class AtomicCounter:
+    """
+    Counter that can be incremented from many threads without a lock
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # next() on itertools.count is a single C call, so increments are
+        # atomic under the GIL; reads are rarer and take a small lock
+        self._counter = itertools.count()
+        self._reads = 0
+        self._read_lock = threading.Lock()
+
+    def increment(self):
+        next(self._counter)
+
+    @property
+    def value(self) -> int:
+        # Each read also advances the counter, so subtract the reads so far
+        with self._read_lock:
+            value = next(self._counter) - self._reads
+            self._reads += 1
+        return value
+
+
+# Encoders are built once and reused for every export
+_PRETTY_ENCODER = json.JSONEncoder(indent=2)
+_COMPACT_ENCODER = json.JSONEncoder(separators=(',', ':'))
+
+SECONDS_TO_MINUTES = 1 / 60
+
+# Must be a power of two; shards are picked by masking the proxy hash
+PROXY_SHARD_COUNT = 16
+
+
+# Starting values for a proxy's metrics; copied on its first use
+_PROXY_TEMPLATE = {
+    'requests': 0,
+    'successes': 0,
+    'failures': 0,
+    'avg_response_time': 0,
+    'last_used': 0
+}
+
+
+class RingBuffer:
+    """
+    Fixed-size window of floats stored densely in an array('d')
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._data = array('d', [0.0]) * size
+        self._head = 0
+        self._fill = 0
+
+    def append(self, value: float) -> float:
+        """Add a value, returning the one it pushed out (or 0.0)"""
+        if not self.size:
+            return value
+
+        evicted = self._data[self._head] if self._fill == self.size else 0.0
+        self._data[self._head] = value
+        self._head = (self._head + 1) % self.size
+        if self._fill < self.size:
+            self._fill += 1
+        return evicted
+
+    def clear(self):
+        self._head = 0
+        self._fill = 0
+
+    def __len__(self) -> int:
+        return self._fill
+
+    def __iter__(self):
+        # Oldest value first; until the buffer wraps, head == fill
+        if self._fill < self.size:
+            return iter(self._data[:self._fill])
+        return itertools.chain(self._data[self._head:], self._data[:self._head])
+
+
+def _push(window: deque, value):
+    """Append to a bounded deque, returning the value it pushed out (or 0)"""
+    evicted = window[0] if window and len(window) == window.maxlen else 0
+    window.append(value)
+    return evicted
+
+
 class MetricsCollector:
     """
     Collects and manages metrics for CloudScraper performance monitoring
     """
     
-    def __init__(self, max_history_size: int = 1000):
+    def __init__(self, max_history_size: int = 1000, health_ttl: float = 0.5):
         self.max_history_size = max_history_size
         self._lock = threading.Lock()
+
+        # get_health_status results are reused for health_ttl seconds so
+        # frequent pollers do not each pay for a full stats snapshot
+        self.health_ttl = health_ttl
+        self._health_lock = threading.Lock()
+        self._health_cache = (float('-inf'), None)
         
-        # Request metrics
-        self.request_count = 0
-        self.success_count = 0
-        self.failure_count = 0
-        self.challenge_count = 0
-        self.retry_count = 0
+        # Request metrics; plain counters are lock-free, _lock only guards
+        # the deques and dicts below
+        self._request_count = AtomicCounter()
+        self._success_count = AtomicCounter()
+        self._failure_count = AtomicCounter()
+        self._challenge_count = AtomicCounter()
+        self._retry_count = AtomicCounter()
         
         # Response time tracking
-        self.response_times = deque(maxlen=max_history_size)
-        self.challenge_solve_times = deque(maxlen=max_history_size)
+        self.response_times = RingBuffer(max_history_size)
+        self.challenge_solve_times = RingBuffer(max_history_size)
+        # Running sums of the windows, updated on every append and eviction
+        # so averages do not have to walk them
+        self._response_time_sum = 0.0
+        self._challenge_time_sum = 0.0
+        self._success_sum = 0
         
         # Status code tracking
         self.status_codes = defaultdict(int)
@@ -40,121 +145,172 @@ class MetricsCollector:
         # Session tracking
         self.session_start_time = time.time()
         self.last_request_time = 0
+        # Request times are read from the monotonic clock and shifted onto
+        # the epoch once, so minute buckets keep counting through wall
+        # clock adjustments
+        self._epoch_offset = self.session_start_time - time.monotonic()
         
         # Performance tracking
         self.requests_per_minute = deque(maxlen=60)  # Last 60 minutes
         self.success_rate_history = deque(maxlen=100)  # Last 100 requests
         
-        # Proxy metrics (if using proxies)
-        self.proxy_metrics = defaultdict(lambda: {
-            'requests': 0,
-            'successes': 0,
-            'failures': 0,
-            'avg_response_time': 0,
-            'last_used': 0
-        })
-        
+        # Proxy metrics (if using proxies), sharded by proxy hash so that
+        # updates for different proxies do not contend on one lock
+        self._proxy_shards = [
+            (threading.Lock(), {})
+            for _ in range(PROXY_SHARD_COUNT)
+        ]
+
+    def _proxy_shard(self, proxy: str):
+        """Get the (lock, metrics) shard that holds a proxy"""
+        return self._proxy_shards[hash(proxy) & (PROXY_SHARD_COUNT - 1)]
+
+    @property
+    def proxy_metrics(self) -> Dict[str, Dict[str, Any]]:
+        """Snapshot of per-proxy metrics merged across shards"""
+        merged = {}
+        for lock, shard in self._proxy_shards:
+            with lock:
+                merged.update((proxy, dict(metrics)) for proxy, metrics in shard.items())
+        return merged
+
+    @property
+    def request_count(self) -> int:
+        return self._request_count.value
+
+    @property
+    def success_count(self) -> int:
+        return self._success_count.value
+
+    @property
+    def failure_count(self) -> int:
+        return self._failure_count.value
+
+    @property
+    def challenge_count(self) -> int:
+        return self._challenge_count.value
+
+    @property
+    def retry_count(self) -> int:
+        return self._retry_count.value
+
     def record_request_start(self, method: str, url: str, proxy: Optional[str] = None):
         """Record the start of a request"""
+        self._request_count.increment()
+        now = time.monotonic() + self._epoch_offset
+        self.last_request_time = now
+        current_minute = int(now * SECONDS_TO_MINUTES)
+
         with self._lock:
-            self.request_count += 1
-            self.last_request_time = time.time()
-            
             # Track requests per minute
-            current_minute = int(time.time() // 60)
             if not self.requests_per_minute or self.requests_per_minute[-1][0] != current_minute:
                 self.requests_per_minute.append([current_minute, 1])
             else:
                 self.requests_per_minute[-1][1] += 1
-                
-            if proxy:
-                self.proxy_metrics[proxy]['requests'] += 1
-                self.proxy_metrics[proxy]['last_used'] = time.time()
+
+        if proxy:
+            lock, shard = self._proxy_shard(proxy)
+            with lock:
+                pm = shard.get(proxy)
+                if pm is None:
+                    pm = shard[proxy] = _PROXY_TEMPLATE.copy()
+                pm['requests'] += 1
+                pm['last_used'] = now
                 
     def record_request_end(self, status_code: int, response_time: float, 
                           proxy: Optional[str] = None, error: Optional[str] = None):
         """Record the end of a request"""
         with self._lock:
-            self.response_times.append(response_time)
+            self._response_time_sum += response_time - self.response_times.append(response_time)
             self.status_codes[status_code] += 1
             
             if error:
-                self.failure_count += 1
+                self._failure_count.increment()
                 self.errors[error] += 1
-                self.success_rate_history.append(0)
-                
-                if proxy:
-                    self.proxy_metrics[proxy]['failures'] += 1
+                self._success_sum -= _push(self.success_rate_history, 0)
             else:
-                self.success_count += 1
-                self.success_rate_history.append(1)
-                
-                if proxy:
-                    self.proxy_metrics[proxy]['successes'] += 1
+                self._success_count.increment()
+                self._success_sum += 1 - _push(self.success_rate_history, 1)
+
+        if proxy:
+            lock, shard = self._proxy_shard(proxy)
+            with lock:
+                pm = shard.get(proxy)
+                if pm is None:
+                    pm = shard[proxy] = _PROXY_TEMPLATE.copy()
+                if error:
+                    pm['failures'] += 1
+                else:
+                    pm['successes'] += 1
                     # Update average response time
-                    proxy_data = self.proxy_metrics[proxy]
-                    total_successes = proxy_data['successes']
+                    total_successes = pm['successes']
                     if total_successes == 1:
-                        proxy_data['avg_response_time'] = response_time
+                        pm['avg_response_time'] = response_time
                     else:
                         # Running average
-                        proxy_data['avg_response_time'] = (
-                            (proxy_data['avg_response_time'] * (total_successes - 1) + response_time) 
+                        pm['avg_response_time'] = (
+                            (pm['avg_response_time'] * (total_successes - 1) + response_time) 
                             / total_successes
                         )
                         
     def record_challenge(self, challenge_type: str, solve_time: float):
         """Record a challenge encounter and solve time"""
+        self._challenge_count.increment()
         with self._lock:
-            self.challenge_count += 1
             self.challenge_types[challenge_type] += 1
-            self.challenge_solve_times.append(solve_time)
+            self._challenge_time_sum += solve_time - self.challenge_solve_times.append(solve_time)
             
     def record_retry(self, retry_type: str):
         """Record a retry attempt"""
-        with self._lock:
-            self.retry_count += 1
+        self._retry_count.increment()
             
     def get_current_stats(self) -> Dict[str, Any]:
         """Get current statistics"""
+        # Snapshot the lock-free counters first, then the guarded structures
+        request_count = self.request_count
+        success_count = self.success_count
+        failure_count = self.failure_count
+        challenge_count = self.challenge_count
+        retry_count = self.retry_count
+
         with self._lock:
             current_time = time.time()
             session_duration = current_time - self.session_start_time
             
             # Calculate rates
-            requests_per_second = self.request_count / session_duration if session_duration > 0 else 0
-            success_rate = (self.success_count / self.request_count) if self.request_count > 0 else 0
+            requests_per_second = request_count / session_duration if session_duration > 0 else 0
+            success_rate = (success_count / request_count) if request_count > 0 else 0
             
             # Calculate average response time
             avg_response_time = (
-                sum(self.response_times) / len(self.response_times) 
+                self._response_time_sum / len(self.response_times)
                 if self.response_times else 0
             )
             
             # Calculate recent success rate (last 100 requests)
             recent_success_rate = (
-                sum(self.success_rate_history) / len(self.success_rate_history)
+                self._success_sum / len(self.success_rate_history)
                 if self.success_rate_history else 0
             )
             
             # Calculate average challenge solve time
             avg_challenge_time = (
-                sum(self.challenge_solve_times) / len(self.challenge_solve_times)
+                self._challenge_time_sum / len(self.challenge_solve_times)
                 if self.challenge_solve_times else 0
             )
             
             return {
                 'session_duration': session_duration,
-                'total_requests': self.request_count,
-                'successful_requests': self.success_count,
-                'failed_requests': self.failure_count,
+                'total_requests': request_count,
+                'successful_requests': success_count,
+                'failed_requests': failure_count,
                 'success_rate': success_rate,
                 'recent_success_rate': recent_success_rate,
                 'requests_per_second': requests_per_second,
                 'avg_response_time': avg_response_time,
-                'challenges_encountered': self.challenge_count,
+                'challenges_encountered': challenge_count,
                 'avg_challenge_solve_time': avg_challenge_time,
-                'retry_attempts': self.retry_count,
+                'retry_attempts': retry_count,
                 'status_codes': dict(self.status_codes),
                 'challenge_types': dict(self.challenge_types),
                 'errors': dict(self.errors),
@@ -163,25 +319,32 @@ class MetricsCollector:
             
     def get_proxy_stats(self) -> Dict[str, Any]:
         """Get proxy-specific statistics"""
-        with self._lock:
+        # Take every shard lock, always in the same order, for a consistent view
+        for lock, _ in self._proxy_shards:
+            lock.acquire()
+        try:
             proxy_stats = {}
-            for proxy, metrics in self.proxy_metrics.items():
-                total_requests = metrics['requests']
-                success_rate = (
-                    metrics['successes'] / total_requests 
-                    if total_requests > 0 else 0
-                )
+            for _, shard in self._proxy_shards:
+                for proxy, metrics in shard.items():
+                    total_requests = metrics['requests']
+                    success_rate = (
+                        metrics['successes'] / total_requests 
+                        if total_requests > 0 else 0
+                    )
                 
-                proxy_stats[proxy] = {
-                    'total_requests': total_requests,
-                    'successes': metrics['successes'],
-                    'failures': metrics['failures'],
-                    'success_rate': success_rate,
-                    'avg_response_time': metrics['avg_response_time'],
-                    'last_used': metrics['last_used']
-                }
-                
-            return proxy_stats
+                    proxy_stats[proxy] = {
+                        'total_requests': total_requests,
+                        'successes': metrics['successes'],
+                        'failures': metrics['failures'],
+                        'success_rate': success_rate,
+                        'avg_response_time': metrics['avg_response_time'],
+                        'last_used': metrics['last_used']
+                    }
+        finally:
+            for lock, _ in self._proxy_shards:
+                lock.release()
+
+        return proxy_stats
             
     def get_performance_trends(self) -> Dict[str, Any]:
         """Get performance trend data"""
@@ -192,8 +355,9 @@ class MetricsCollector:
             # Success rate trend (last 100 requests in chunks of 10)
             success_trend = []
             if len(self.success_rate_history) >= 10:
-                for i in range(0, len(self.success_rate_history), 10):
-                    chunk = list(self.success_rate_history)[i:i+10]
+                success_history_list = list(self.success_rate_history)
+                for i in range(0, len(success_history_list), 10):
+                    chunk = success_history_list[i:i+10]
                     if chunk:
                         success_trend.append(sum(chunk) / len(chunk))
             
@@ -212,8 +376,8 @@ class MetricsCollector:
                 'response_time_trend': response_time_trend
             }
             
-    def export_metrics(self, format: str = 'json') -> str:
-        """Export metrics in specified format"""
+    def export_metrics(self, format: str = 'json', indent: Optional[int] = 2) -> str:
+        """Export metrics in specified format; indent=None gives compact JSON"""
         stats = self.get_current_stats()
         proxy_stats = self.get_proxy_stats()
         trends = self.get_performance_trends()
@@ -226,34 +390,62 @@ class MetricsCollector:
         }
         
         if format.lower() == 'json':
-            return json.dumps(export_data, indent=2)
+            if indent is None:
+                encoder = _COMPACT_ENCODER
+            elif indent == 2:
+                encoder = _PRETTY_ENCODER
+            else:
+                encoder = json.JSONEncoder(indent=indent)
+            return encoder.encode(export_data)
         else:
             raise ValueError(f"Unsupported export format: {format}")
             
     def reset_metrics(self):
         """Reset all metrics"""
         with self._lock:
-            self.request_count = 0
-            self.success_count = 0
-            self.failure_count = 0
-            self.challenge_count = 0
-            self.retry_count = 0
+            self._request_count.reset()
+            self._success_count.reset()
+            self._failure_count.reset()
+            self._challenge_count.reset()
+            self._retry_count.reset()
             
             self.response_times.clear()
             self.challenge_solve_times.clear()
+            self._response_time_sum = 0.0
+            self._challenge_time_sum = 0.0
             self.status_codes.clear()
             self.challenge_types.clear()
             self.errors.clear()
             
             self.session_start_time = time.time()
             self.last_request_time = 0
+            self._epoch_offset = self.session_start_time - time.monotonic()
             
             self.requests_per_minute.clear()
             self.success_rate_history.clear()
-            self.proxy_metrics.clear()
+            self._success_sum = 0
+
+        for lock, shard in self._proxy_shards:
+            with lock:
+                shard.clear()
+
+        with self._health_lock:
+            self._health_cache = (float('-inf'), None)
             
     def get_health_status(self) -> Dict[str, Any]:
         """Get overall health status"""
+        with self._health_lock:
+            cached_at, health = self._health_cache
+            now = time.monotonic()
+            if health is None or now - cached_at >= self.health_ttl:
+                health = self._compute_health_status()
+                self._health_cache = (now, health)
+        # Callers get their own copy, so changing it leaves the cache intact
+        return dict(health, issues=list(health['issues']),
+                    recommendations=list(health['recommendations']))
+
+    def _compute_health_status(self) -> Dict[str, Any]:
+        """Build the health status from a fresh stats snapshot"""
         stats = self.get_current_stats()
         
         # Determine health based on success rate and error patterns
@@ -6,15 +6,118 @@ This module implements ML-based optimization for bypass patterns,
 learning from success/failure patterns to improve bypass rates.
 """
 
-import json
 import time
-import hashlib
-import statistics
-from typing import Dict, List, Any, Optional, Tuple
-from collections import defaultdict, deque
-from dataclasses import dataclass, asdict
+from array import array
+from typing import Dict, List, Any, NamedTuple, Optional, Tuple, Union
+from collections import defaultdict, deque, namedtuple
+from dataclasses import dataclass
+from datetime import datetime
+from operator import itemgetter
 import logging
 
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    np = None
+    HAS_NUMPY = False
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+def _context_similarity_kernel(timestamps, hours, days, behaviors,
+                               current_hour, current_day, current_behavior, now):
+    """Mean similarity of past attempts (given column-wise) to the current context"""
+    n = len(timestamps)
+    if n == 0:
+        return 0.5  # Neutral similarity
+
+    total = 0.0
+    for i in range(n):
+        # Time similarity
+        hour_diff = abs(hours[i] - current_hour)
+        total += (1.0 - min(hour_diff, 24 - hour_diff) / 12.0) * 0.3
+
+        # Day similarity
+        day_diff = abs(days[i] - current_day)
+        total += (1.0 - min(day_diff, 7 - day_diff) / 3.5) * 0.2
+
+        # Behavior profile similarity
+        total += (1.0 if behaviors[i] == current_behavior else 0.5) * 0.3
+
+        # Recency similarity (more recent = more similar), decays over 24 hours
+        age_hours = (now - timestamps[i]) / 3600.0
+        total += max(0.0, 1.0 - age_hours / 24.0) * 0.2
+
+    return total / n
+
+
+if HAS_NUMBA:
+    _context_similarity_kernel = njit(cache=True, fastmath=True)(_context_similarity_kernel)
+
+_kernel_warmed_up = False
+
+
+def _warm_up_kernels():
+    """Compile (or load from cache) the JIT kernels once per process"""
+    global _kernel_warmed_up
+    if HAS_NUMBA and not _kernel_warmed_up:
+        zeros = np.zeros(1)
+        _context_similarity_kernel(zeros, zeros, zeros, np.zeros(1, dtype=np.int64), 12.0, 1.0, 0, 0.0)
+        _kernel_warmed_up = True
+
+
+def _summary_stats(values: List[float]) -> Dict[str, float]:
+    """min/max/mean/median of a non-empty list, from a single sort"""
+    values = sorted(values)
+    count = len(values)
+    middle = count // 2
+    if count % 2:
+        median = values[middle]
+    else:
+        median = (values[middle - 1] + values[middle]) / 2
+    return {
+        'min': values[0],
+        'max': values[-1],
+        'mean': sum(values) / count,
+        'median': median
+    }
+
+
+FNV64_OFFSET_BASIS = 0xcbf29ce484222325
+FNV64_PRIME = 0x100000001b3
+FNV64_MASK = 0xffffffffffffffff
+
+
+def _fnv1a_64(data: bytes) -> int:
+    """64-bit FNV-1a hash"""
+    value = FNV64_OFFSET_BASIS
+    for byte in data:
+        value = ((value ^ byte) * FNV64_PRIME) & FNV64_MASK
+    return value
+
+
+def _string_feature(value: str) -> float:
+    """
+    Bucket a string field into [0, 1) for use as a numeric feature.
+    Uses FNV-1a rather than hash(), which is salted per process, so the
+    same string maps to the same feature (and learned weights stay
+    meaningful) across runs.
+    """
+    return _fnv1a_64(value.encode('utf-8')) % 1000 / 1000.0
+
+
+def _fill_feature_vector(values: Tuple[float, ...], out=None):
+    """Return values as a new list, or copy them into out and return it"""
+    if out is None:
+        return list(values)
+    out[:len(values)] = values
+    return out
+
 
 @dataclass
 class BypassAttempt:
@@ -45,9 +148,12 @@ class BypassAttempt:
     day_of_week: int  # 0=Monday, 6=Sunday
     session_age: float
     
-    def to_feature_vector(self) -> List[float]:
-        """Convert to ML feature vector"""
-        return [
+    def to_feature_vector(self, out=None) -> List[float]:
+        """
+        Convert to ML feature vector. Pass out (a list or 1-d numpy array
+        of 13 floats, e.g. a row of a feature matrix) to fill it in place.
+        """
+        values = (
             # Timing features
             self.response_time,
             self.delay_used,
@@ -56,8 +162,8 @@ class BypassAttempt:
             float(self.day_of_week) / 7.0,   # Normalize
             
             # Strategy features (one-hot encoded would be better, but simplified)
-            hash(self.bypass_strategy) % 1000 / 1000.0,
-            hash(self.behavior_profile) % 1000 / 1000.0,
+            _string_feature(self.bypass_strategy),
+            _string_feature(self.behavior_profile),
             
             # Context features
             float(self.anti_detection_enabled),
@@ -65,10 +171,296 @@ class BypassAttempt:
             float(self.status_code) / 1000.0,  # Normalize
             
             # Fingerprint diversity (simplified hash-based measure)
-            hash(self.tls_fingerprint) % 1000 / 1000.0,
-            hash(self.canvas_fingerprint) % 1000 / 1000.0,
-            hash(self.webgl_fingerprint) % 1000 / 1000.0,
-        ]
+            _string_feature(self.tls_fingerprint),
+            _string_feature(self.canvas_fingerprint),
+            _string_feature(self.webgl_fingerprint),
+        )
+        return _fill_feature_vector(values, out)
+
+
+# Window, in seconds, for recency bonuses and recent success rates
+RECENT_WINDOW = 3600
+
+# Number of recent successes per strategy compared against the current context
+CONTEXT_WINDOW = 10
+
+# Attempts older than this (seconds) are dropped from the domain models, at
+# most once per CLEANUP_INTERVAL per domain
+HISTORY_TTL = 86400
+CLEANUP_INTERVAL = 60
+
+# The interned string table is compacted once it holds this many strings
+# per string cell of the attempt store
+STRING_TABLE_ROW_FACTOR = 2
+
+
+def _evict_before(timestamps: deque, cutoff: float) -> int:
+    """Drop timestamps at or before cutoff from the left; return how many remain"""
+    while timestamps and timestamps[0] <= cutoff:
+        timestamps.popleft()
+    return len(timestamps)
+
+
+def _append_recent(timestamps: deque, timestamp: float, cutoff: float):
+    """Append a timestamp to a recent-window deque, expiring old entries"""
+    _evict_before(timestamps, cutoff)
+    timestamps.append(timestamp)
+
+
+class _Interner:
+    """
+    Maps strings to small integer ids, assigned in order of first use.
+    features[id] holds the string's feature value, computed once on insert.
+    """
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.values: List[str] = []
+        self.features = array('d')
+
+    def intern(self, value: str) -> int:
+        value_id = self.ids.get(value)
+        if value_id is None:
+            value_id = self.ids[value] = len(self.values)
+            self.values.append(value)
+            self.features.append(_string_feature(value))
+        return value_id
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def compact(self, live_ids) -> array:
+        """
+        Keep only the strings whose ids are in live_ids, renumbering them in
+        their existing order. Returns the old-to-new id map, -1 for dropped.
+        """
+        remap = array('q', [-1]) * len(self.values)
+        values = []
+        features = array('d')
+        for old_id in sorted(live_ids):
+            remap[old_id] = len(values)
+            values.append(self.values[old_id])
+            features.append(self.features[old_id])
+
+        self.values = values
+        self.features = features
+        self.ids = {value: value_id for value_id, value in enumerate(values)}
+        return remap
+
+
+class _ContextWindow:
+    """
+    Context columns of the last few successful attempts of one strategy,
+    oldest first, kept ready to hand to the similarity kernel.
+    """
+
+    def __init__(self, size: int = CONTEXT_WINDOW):
+        self.size = size
+        self.timestamps = array('d')
+        self.hours = array('d')
+        self.days = array('d')
+        self.behaviors = array('q')
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def append(self, timestamp: float, hour: int, day: int, behavior_id: int):
+        if len(self.timestamps) == self.size:
+            del self.timestamps[0], self.hours[0], self.days[0], self.behaviors[0]
+        self.timestamps.append(timestamp)
+        self.hours.append(hour)
+        self.days.append(day)
+        self.behaviors.append(behavior_id)
+
+    def expire(self, cutoff: float):
+        """Drop leading entries at or before cutoff"""
+        timestamps = self.timestamps
+        count = 0
+        while count < len(timestamps) and timestamps[count] <= cutoff:
+            count += 1
+        if count:
+            del self.timestamps[:count], self.hours[:count], self.days[:count], self.behaviors[:count]
+
+    def similarity(self, current_hour: float, current_day: float, current_behavior: int, now: float) -> float:
+        """Mean similarity of the windowed attempts to the current context"""
+        if HAS_NUMBA:
+            return _context_similarity_kernel(
+                np.frombuffer(self.timestamps, dtype=np.float64),
+                np.frombuffer(self.hours, dtype=np.float64),
+                np.frombuffer(self.days, dtype=np.float64),
+                np.frombuffer(self.behaviors, dtype=np.int64),
+                current_hour, current_day, current_behavior, now
+            )
+        return _context_similarity_kernel(
+            self.timestamps, self.hours, self.days, self.behaviors,
+            current_hour, current_day, current_behavior, now
+        )
+
+
+class ColumnarAttemptStore:
+    """
+    Ring buffer of bypass attempts stored column by column.
+
+    Every field lives in its own typed array instead of one object per
+    attempt, so a scan over one field only touches that field, and string
+    fields are kept as interned integer ids.
+    """
+
+    FLOAT_COLUMNS = ('timestamp', 'response_time', 'delay_used', 'session_age', 'detection_confidence')
+    INT_COLUMNS = (('time_of_day', 'b'), ('day_of_week', 'b'), ('status_code', 'h'),
+                   ('success', 'b'), ('anti_detection_enabled', 'b'))
+    STRING_COLUMNS = ('domain', 'challenge_type', 'bypass_strategy', 'behavior_profile',
+                      'tls_fingerprint', 'canvas_fingerprint', 'webgl_fingerprint')
+
+    def __init__(self, max_history: int = 1000, interner: Optional[_Interner] = None):
+        self.max_history = max_history
+        self.interner = interner or _Interner()
+        self.head = 0
+        self.size = 0
+
+        for name in self.FLOAT_COLUMNS:
+            setattr(self, name, array('d', [0.0]) * max_history)
+        for name, typecode in self.INT_COLUMNS:
+            setattr(self, name, array(typecode, [0]) * max_history)
+        for name in self.STRING_COLUMNS:
+            setattr(self, name, array('i', [0]) * max_history)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, attempt: 'BypassAttempt') -> int:
+        """Write an attempt into the next row, overwriting the oldest when full"""
+        row = self.head
+        for name in self.FLOAT_COLUMNS:
+            getattr(self, name)[row] = getattr(attempt, name)
+        for name, _ in self.INT_COLUMNS:
+            getattr(self, name)[row] = int(getattr(attempt, name))
+        intern = self.interner.intern
+        for name in self.STRING_COLUMNS:
+            getattr(self, name)[row] = intern(getattr(attempt, name))
+
+        self.head = (row + 1) % self.max_history
+        if self.size < self.max_history:
+            self.size += 1
+        return row
+
+    def compact_strings(self, extra_columns=()):
+        """
+        Drop interned strings that no stored row, and no id array in
+        extra_columns, still refers to, rewriting those ids in place
+        """
+        size = self.size
+        live = set()
+        for name in self.STRING_COLUMNS:
+            live.update(getattr(self, name)[:size])
+        for column in extra_columns:
+            live.update(column)
+
+        remap = self.interner.compact(live)
+        for name in self.STRING_COLUMNS:
+            column = getattr(self, name)
+            column[:size] = array(column.typecode, [remap[value_id] for value_id in column[:size]])
+        for column in extra_columns:
+            column[:] = array(column.typecode, [remap[value_id] for value_id in column])
+
+    def rows(self) -> List[int]:
+        """Row indices from oldest to newest"""
+        if self.size < self.max_history:
+            return list(range(self.size))
+        return list(range(self.head, self.max_history)) + list(range(self.head))
+
+    def to_feature_matrix(self, indices: Optional[List[int]] = None):
+        """
+        Feature vectors (as BypassAttempt.to_feature_vector) for the given
+        rows, oldest first by default. Returns an (n, 13) float32 array when
+        numpy is available, else a list of lists.
+        """
+        if indices is None:
+            indices = self.rows()
+
+        string_features = self.interner.features
+
+        if HAS_NUMPY:
+            idx = np.asarray(indices, dtype=np.intp)
+
+            def column(name, dtype=np.float64):
+                return np.frombuffer(getattr(self, name), dtype=dtype)[idx]
+
+            string_table = np.frombuffer(string_features, dtype=np.float64)
+            matrix = np.empty((len(idx), 13), dtype=np.float32)
+            matrix[:, 0] = column('response_time')
+            matrix[:, 1] = column('delay_used')
+            matrix[:, 2] = column('session_age')
+            matrix[:, 3] = column('time_of_day', np.int8) / 24.0
+            matrix[:, 4] = column('day_of_week', np.int8) / 7.0
+            matrix[:, 5] = string_table[column('bypass_strategy', np.int32)]
+            matrix[:, 6] = string_table[column('behavior_profile', np.int32)]
+            matrix[:, 7] = column('anti_detection_enabled', np.int8)
+            matrix[:, 8] = column('detection_confidence')
+            matrix[:, 9] = column('status_code', np.int16) / 1000.0
+            matrix[:, 10] = string_table[column('tls_fingerprint', np.int32)]
+            matrix[:, 11] = string_table[column('canvas_fingerprint', np.int32)]
+            matrix[:, 12] = string_table[column('webgl_fingerprint', np.int32)]
+            return matrix
+
+        return [self.feature_vector(i) for i in indices]
+
+    def feature_vector(self, row: int, out=None) -> List[float]:
+        """Feature vector of one row, as BypassAttempt.to_feature_vector"""
+        return _fill_feature_vector(self.feature_values(row), out)
+
+    def feature_values(self, row: int) -> Tuple[float, ...]:
+        """Feature values of one row as a tuple, for read-only consumers"""
+        string_features = self.interner.features
+        return (
+            self.response_time[row],
+            self.delay_used[row],
+            self.session_age[row],
+            self.time_of_day[row] / 24.0,
+            self.day_of_week[row] / 7.0,
+            string_features[self.bypass_strategy[row]],
+            string_features[self.behavior_profile[row]],
+            float(self.anti_detection_enabled[row]),
+            self.detection_confidence[row],
+            self.status_code[row] / 1000.0,
+            string_features[self.tls_fingerprint[row]],
+            string_features[self.canvas_fingerprint[row]],
+            string_features[self.webgl_fingerprint[row]],
+        )
+
+
+# What the domain models keep of each attempt: enough to expire it and to
+# update the hour counters and delay statistics, without holding on to the
+# full BypassAttempt and its strings
+PatternRecord = namedtuple('PatternRecord', ['timestamp', 'time_of_day', 'delay_used'])
+
+
+class DomainModel:
+    """Learned state for one domain"""
+    __slots__ = ('success_patterns', 'failure_patterns', 'success_count', 'failure_count',
+                 'recent_successes', 'ctx_windows', 'hour_successes', 'hour_totals',
+                 'recent_success_times', 'recent_failure_times', 'optimal_strategies',
+                 'last_updated', 'last_cleanup_ts')
+
+    def __init__(self):
+        # Per-strategy PatternRecords from the last HISTORY_TTL seconds
+        self.success_patterns: Dict[str, deque] = defaultdict(deque)
+        self.failure_patterns: Dict[str, deque] = defaultdict(deque)
+        # Counts of the attempts currently held in the pattern stores, and
+        # timestamps from the last hour, kept up to date as attempts are
+        # recorded and expire so predictions never rescan the stores
+        self.success_count: Dict[str, int] = defaultdict(int)
+        self.failure_count: Dict[str, int] = defaultdict(int)
+        self.recent_successes: Dict[str, deque] = defaultdict(deque)
+        self.ctx_windows: Dict[str, _ContextWindow] = defaultdict(_ContextWindow)
+        # Successes and attempts held in the pattern stores, by hour of day
+        self.hour_successes = array('l', [0]) * 24
+        self.hour_totals = array('l', [0]) * 24
+        self.recent_success_times = deque()
+        self.recent_failure_times = deque()
+        self.optimal_strategies = {}
+        self.last_updated = 0
+        self.last_cleanup_ts = 0
 
 
 class SimpleMLOptimizer:
@@ -76,71 +468,138 @@ class SimpleMLOptimizer:
     
     def __init__(self, max_history: int = 1000):
         self.max_history = max_history
-        self.attempt_history = deque(maxlen=max_history)
-        self.domain_models = defaultdict(lambda: {
-            'success_patterns': defaultdict(list),
-            'failure_patterns': defaultdict(list),
-            'optimal_strategies': {},
-            'last_updated': 0
-        })
-        
+        self.attempts = ColumnarAttemptStore(max_history)
+        self.domain_models: Dict[str, DomainModel] = defaultdict(DomainModel)
+        # Size the string table may reach before strings no longer referenced
+        # are dropped; raised after each compaction so it stays amortized
+        self._min_string_limit = STRING_TABLE_ROW_FACTOR * max_history * len(ColumnarAttemptStore.STRING_COLUMNS)
+        self._string_limit = self._min_string_limit
+        
+        _warm_up_kernels()
+
         # Feature importance weights (learned over time)
         self.feature_weights = [1.0] * 13  # 13 features from feature vector
         self.learning_rate = 0.01
         
     def record_attempt(self, attempt: BypassAttempt):
         """Record a bypass attempt for learning"""
-        self.attempt_history.append(attempt)
+        row = self.attempts.append(attempt)
         
         # Update domain-specific model
         domain_model = self.domain_models[attempt.domain]
         
+        strategy = attempt.bypass_strategy
+        record = PatternRecord(attempt.timestamp, attempt.time_of_day, attempt.delay_used)
+        recent_cutoff = time.time() - RECENT_WINDOW
+        domain_model.hour_totals[attempt.time_of_day] += 1
         if attempt.success:
-            domain_model['success_patterns'][attempt.bypass_strategy].append(attempt)
+            domain_model.hour_successes[attempt.time_of_day] += 1
+            domain_model.success_patterns[strategy].append(record)
+            domain_model.success_count[strategy] += 1
+            domain_model.ctx_windows[strategy].append(
+                attempt.timestamp, attempt.time_of_day, attempt.day_of_week,
+                self.attempts.behavior_profile[row]
+            )
+            _append_recent(domain_model.recent_successes[strategy], attempt.timestamp, recent_cutoff)
+            _append_recent(domain_model.recent_success_times, attempt.timestamp, recent_cutoff)
         else:
-            domain_model['failure_patterns'][attempt.bypass_strategy].append(attempt)
+            domain_model.failure_patterns[strategy].append(record)
+            domain_model.failure_count[strategy] += 1
+            _append_recent(domain_model.recent_failure_times, attempt.timestamp, recent_cutoff)
         
-        domain_model['last_updated'] = time.time()
+        domain_model.last_updated = time.time()
         
         # Update feature weights based on success/failure
-        self._update_feature_weights(attempt)
+        self._update_feature_weights(attempt, row)
+        
+        if len(self.attempts.interner) > self._string_limit:
+            self._compact_strings()
         
         # Cleanup old data
-        self._cleanup_old_data(attempt.domain)
+        if domain_model.last_updated - domain_model.last_cleanup_ts >= CLEANUP_INTERVAL:
+            self._cleanup_old_data(attempt.domain)
+    
+    def _compact_strings(self):
+        """Drop interned strings that neither the attempt store nor a context window still uses"""
+        behavior_columns = [
+            window.behaviors
+            for domain_model in self.domain_models.values()
+            for window in domain_model.ctx_windows.values()
+        ]
+        self.attempts.compact_strings(behavior_columns)
+        self._string_limit = max(self._min_string_limit, 2 * len(self.attempts.interner))
     
-    def _update_feature_weights(self, attempt: BypassAttempt):
+    def _update_feature_weights(self, attempt: BypassAttempt, row: int):
         """Update feature weights based on attempt outcome"""
-        features = attempt.to_feature_vector()
+        # Read the features back from the stored row, where string fields
+        # are already interned and their feature values precomputed; they
+        # are only read, so a tuple does instead of a fresh list
+        features = self.attempts.feature_values(row)
         
         # Simple weight adjustment based on success/failure
         adjustment = self.learning_rate if attempt.success else -self.learning_rate
         
-        for i, feature_value in enumerate(features):
-            if feature_value > 0:  # Only adjust for non-zero features
-                self.feature_weights[i] += adjustment * feature_value
-                # Keep weights positive and bounded
-                self.feature_weights[i] = max(0.1, min(2.0, self.feature_weights[i]))
+        # Only adjust for non-zero features, then keep weights positive and
+        # bounded; both passes are comprehensions over the 13 features
+        weights = self.feature_weights
+        adjusted = [
+            weight + adjustment * feature_value if feature_value > 0 else weight
+            for weight, feature_value in zip(weights, features)
+        ]
+        weights[:] = [
+            0.1 if weight < 0.1 else 2.0 if weight > 2.0 else weight
+            for weight in adjusted
+        ]
     
     def _cleanup_old_data(self, domain: str):
         """Clean up old data to prevent memory bloat"""
         domain_model = self.domain_models[domain]
-        cutoff_time = time.time() - 86400  # 24 hours
-        
-        for strategy, attempts in domain_model['success_patterns'].items():
-            domain_model['success_patterns'][strategy] = [
-                attempt for attempt in attempts if attempt.timestamp > cutoff_time
-            ]
-        
-        for strategy, attempts in domain_model['failure_patterns'].items():
-            domain_model['failure_patterns'][strategy] = [
-                attempt for attempt in attempts if attempt.timestamp > cutoff_time
-            ]
+        now = time.time()
+        cutoff_time = now - HISTORY_TTL
+        domain_model.last_cleanup_ts = now
+        
+        hour_successes = domain_model.hour_successes
+        hour_totals = domain_model.hour_totals
+        
+        # Attempts are appended in time order, so only the expired prefix of
+        # each deque has to be touched
+        for strategy, records in domain_model.success_patterns.items():
+            while records and records[0].timestamp <= cutoff_time:
+                hour = records.popleft().time_of_day
+                hour_successes[hour] -= 1
+                hour_totals[hour] -= 1
+            domain_model.success_count[strategy] = len(records)
+            domain_model.ctx_windows[strategy].expire(cutoff_time)
+        
+        for strategy, records in domain_model.failure_patterns.items():
+            while records and records[0].timestamp <= cutoff_time:
+                hour_totals[records.popleft().time_of_day] -= 1
+            domain_model.failure_count[strategy] = len(records)
+
+    def recent_success_rate(self, domain: str) -> float:
+        """Success rate for a domain over the last hour (1.0 with no attempts)"""
+        domain_model = self.domain_models[domain]
+        recent_cutoff = time.time() - RECENT_WINDOW
+
+        recent_successes = _evict_before(domain_model.recent_success_times, recent_cutoff)
+        recent_total = recent_successes + _evict_before(domain_model.recent_failure_times, recent_cutoff)
+        return recent_successes / recent_total if recent_total > 0 else 1.0
+    
+    def overall_success_rate(self, domain: str) -> Optional[float]:
+        """Success rate over a domain's retained history, None without data"""
+        domain_model = self.domain_models.get(domain)
+        if domain_model is None or not domain_model.success_patterns:
+            return None
+        
+        total_successes = sum(domain_model.success_count.values())
+        total_attempts = total_successes + sum(domain_model.failure_count.values())
+        return total_successes / total_attempts if total_attempts > 0 else None
     
     def predict_best_strategy(self, domain: str, context: Dict[str, Any]) -> Dict[str, Any]:
         """Predict the best bypass strategy for a domain and context"""
         domain_model = self.domain_models[domain]
         
-        if not domain_model['success_patterns']:
+        if not domain_model.success_count:
             # No data yet, return default strategy
             return {
                 'strategy': 'default',
@@ -150,23 +609,24 @@ class SimpleMLOptimizer:
         
         # Calculate success rates for each strategy
         strategy_scores = {}
+        failure_count = domain_model.failure_count
+        recent_cutoff = time.time() - RECENT_WINDOW
         
-        for strategy, successes in domain_model['success_patterns'].items():
-            failures = domain_model['failure_patterns'].get(strategy, [])
-            
-            total_attempts = len(successes) + len(failures)
+        for strategy, success_total in domain_model.success_count.items():
+            total_attempts = success_total + failure_count.get(strategy, 0)
             if total_attempts == 0:
                 continue
             
-            success_rate = len(successes) / total_attempts
+            success_rate = success_total / total_attempts
             
-            # Weight by recency
-            recent_successes = sum(1 for attempt in successes 
-                                 if attempt.timestamp > time.time() - 3600)  # Last hour
+            # Weight by recency (successes in the last hour)
+            recent_successes = _evict_before(domain_model.recent_successes[strategy], recent_cutoff)
             recency_bonus = recent_successes * 0.1
             
             # Weight by context similarity
-            context_similarity = self._calculate_context_similarity(successes, context)
+            context_similarity = self._calculate_context_similarity(
+                domain_model.ctx_windows[strategy], context
+            )
             
             # Combined score
             strategy_scores[strategy] = (success_rate + recency_bonus) * context_similarity
@@ -178,67 +638,50 @@ class SimpleMLOptimizer:
                 'reasoning': 'No viable strategies found'
             }
         
-        # Select best strategy
-        best_strategy = max(strategy_scores.items(), key=lambda x: x[1])
+        # Rank once; the sort is stable, so ties keep the order max() would
+        # have picked them in
+        ranked = sorted(strategy_scores.items(), key=itemgetter(1), reverse=True)
+        best_strategy = ranked[0]
         
         return {
             'strategy': best_strategy[0],
             'confidence': min(1.0, best_strategy[1]),
             'reasoning': f'Best success rate with context similarity',
-            'alternatives': sorted(strategy_scores.items(), key=lambda x: x[1], reverse=True)[1:3]
+            'alternatives': ranked[1:3]
         }
     
-    def _calculate_context_similarity(self, attempts: List[BypassAttempt], 
+    def _calculate_context_similarity(self, window: _ContextWindow,
                                      context: Dict[str, Any]) -> float:
-        """Calculate similarity between current context and historical attempts"""
-        if not attempts:
+        """Calculate similarity between current context and a strategy's recent successes"""
+        if not len(window):
             return 0.5  # Neutral similarity
         
         # Current context features
         current_hour = context.get('time_of_day', 12)
         current_day = context.get('day_of_week', 1)
         current_behavior = context.get('behavior_profile', 'casual')
-        
-        similarities = []
-        
-        for attempt in attempts[-10:]:  # Last 10 attempts
-            similarity = 0.0
-            
-            # Time similarity
-            hour_diff = abs(attempt.time_of_day - current_hour)
-            hour_similarity = 1.0 - (min(hour_diff, 24 - hour_diff) / 12.0)
-            similarity += hour_similarity * 0.3
-            
-            # Day similarity
-            day_diff = abs(attempt.day_of_week - current_day)
-            day_similarity = 1.0 - (min(day_diff, 7 - day_diff) / 3.5)
-            similarity += day_similarity * 0.2
-            
-            # Behavior profile similarity
-            behavior_similarity = 1.0 if attempt.behavior_profile == current_behavior else 0.5
-            similarity += behavior_similarity * 0.3
-            
-            # Recency similarity (more recent = more similar)
-            age_hours = (time.time() - attempt.timestamp) / 3600
-            recency_similarity = max(0.0, 1.0 - (age_hours / 24.0))  # Decay over 24 hours
-            similarity += recency_similarity * 0.2
-            
-            similarities.append(similarity)
-        
-        return statistics.mean(similarities) if similarities else 0.5
+
+        # Behavior profiles are compared by interned id; a profile never
+        # recorded gets an id that matches nothing
+        current_behavior_id = self.attempts.interner.ids.get(current_behavior, -1)
+
+        return window.similarity(float(current_hour), float(current_day), current_behavior_id, time.time())
     
     def get_optimization_insights(self, domain: str) -> Dict[str, Any]:
         """Get insights about optimization for a domain"""
         domain_model = self.domain_models[domain]
         
-        if not domain_model['success_patterns']:
+        if not domain_model.success_patterns:
             return {'insights': 'No data available for analysis'}
         
         insights = {}
         
+        success_count = domain_model.success_count
+        failure_count = domain_model.failure_count
+        
         # Overall success rate
-        total_successes = sum(len(attempts) for attempts in domain_model['success_patterns'].values())
-        total_failures = sum(len(attempts) for attempts in domain_model['failure_patterns'].values())
+        total_successes = sum(success_count.values())
+        total_failures = sum(failure_count.values())
         total_attempts = total_successes + total_failures
         
         if total_attempts > 0:
@@ -246,11 +689,10 @@ class SimpleMLOptimizer:
         
         # Best performing strategies
         strategy_performance = {}
-        for strategy, successes in domain_model['success_patterns'].items():
-            failures = domain_model['failure_patterns'].get(strategy, [])
-            total = len(successes) + len(failures)
+        for strategy, successes in success_count.items():
+            total = successes + failure_count.get(strategy, 0)
             if total > 0:
-                strategy_performance[strategy] = len(successes) / total
+                strategy_performance[strategy] = successes / total
         
         insights['best_strategies'] = sorted(
             strategy_performance.items(), 
@@ -259,74 +701,71 @@ class SimpleMLOptimizer:
         )[:3]
         
         # Timing insights
-        all_successes = []
-        for attempts in domain_model['success_patterns'].values():
-            all_successes.extend(attempts)
-        
-        if all_successes:
-            successful_delays = [attempt.delay_used for attempt in all_successes]
-            insights['optimal_delay_range'] = {
-                'min': min(successful_delays),
-                'max': max(successful_delays),
-                'mean': statistics.mean(successful_delays),
-                'median': statistics.median(successful_delays)
-            }
-            
-            # Time of day analysis
-            time_success = defaultdict(int)
-            time_total = defaultdict(int)
-            
-            for attempt in all_successes:
-                hour = attempt.time_of_day
-                time_success[hour] += 1
-                time_total[hour] += 1
-            
-            # Add failures to total
-            for attempts in domain_model['failure_patterns'].values():
-                for attempt in attempts:
-                    time_total[attempt.time_of_day] += 1
+        if total_successes:
+            successful_delays = [
+                record.delay_used
+                for records in domain_model.success_patterns.values()
+                for record in records
+            ]
+            insights['optimal_delay_range'] = _summary_stats(successful_delays)
             
-            best_hours = []
-            for hour in range(24):
-                if time_total[hour] > 0:
-                    success_rate = time_success[hour] / time_total[hour]
-                    best_hours.append((hour, success_rate))
+            # Time of day analysis, from the per-hour counts kept as
+            # attempts are recorded and expired
+            hour_successes = domain_model.hour_successes
+            best_hours = [
+                (hour, hour_successes[hour] / total)
+                for hour, total in enumerate(domain_model.hour_totals)
+                if total > 0
+            ]
             
             insights['best_time_hours'] = sorted(best_hours, key=lambda x: x[1], reverse=True)[:3]
         
         return insights
 
 
+class StrategyConfig(NamedTuple):
+    """Immutable settings for a bypass strategy"""
+    behavior_profile: str = 'casual'
+    spoofing_level: str = 'medium'
+    timing_multiplier: float = 1.0
+    anti_detection: bool = True
+
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any]) -> 'StrategyConfig':
+        """Build from a config dict, ignoring unknown keys"""
+        return cls(**{name: config[name] for name in cls._fields if name in config})
+
+
 class AdaptiveStrategySelector:
     """Selects and adapts bypass strategies based on ML insights"""
     
     def __init__(self, optimizer: SimpleMLOptimizer):
         self.optimizer = optimizer
-        self.strategy_registry = {
-            'conservative': {
-                'behavior_profile': 'research',
-                'spoofing_level': 'low',
-                'timing_multiplier': 2.0,
-                'anti_detection': True
-            },
-            'balanced': {
-                'behavior_profile': 'casual',
-                'spoofing_level': 'medium',
-                'timing_multiplier': 1.0,
-                'anti_detection': True
-            },
-            'aggressive': {
-                'behavior_profile': 'focused',
-                'spoofing_level': 'high',
-                'timing_multiplier': 0.5,
-                'anti_detection': True
-            },
-            'stealth': {
-                'behavior_profile': 'research',
-                'spoofing_level': 'high',
-                'timing_multiplier': 3.0,
-                'anti_detection': True
-            }
+        self.strategy_registry: Dict[str, StrategyConfig] = {
+            'conservative': StrategyConfig(
+                behavior_profile='research',
+                spoofing_level='low',
+                timing_multiplier=2.0,
+                anti_detection=True
+            ),
+            'balanced': StrategyConfig(
+                behavior_profile='casual',
+                spoofing_level='medium',
+                timing_multiplier=1.0,
+                anti_detection=True
+            ),
+            'aggressive': StrategyConfig(
+                behavior_profile='focused',
+                spoofing_level='high',
+                timing_multiplier=0.5,
+                anti_detection=True
+            ),
+            'stealth': StrategyConfig(
+                behavior_profile='research',
+                spoofing_level='high',
+                timing_multiplier=3.0,
+                anti_detection=True
+            )
         }
     
     def select_strategy(self, domain: str, current_context: Dict[str, Any]) -> Dict[str, Any]:
@@ -338,12 +777,11 @@ class AdaptiveStrategySelector:
         strategy_name = prediction['strategy']
         confidence = prediction['confidence']
         
-        # Get strategy configuration
-        if strategy_name in self.strategy_registry:
-            strategy_config = self.strategy_registry[strategy_name].copy()
-        else:
+        # Get strategy configuration (immutable, so shared without copying)
+        strategy_config = self.strategy_registry.get(strategy_name)
+        if strategy_config is None:
             # Default to balanced strategy
-            strategy_config = self.strategy_registry['balanced'].copy()
+            strategy_config = self.strategy_registry['balanced']
             strategy_name = 'balanced'
         
         # Apply context-specific adjustments
@@ -357,34 +795,60 @@ class AdaptiveStrategySelector:
             'alternatives': prediction.get('alternatives', [])
         }
     
-    def _apply_context_adjustments(self, strategy_config: Dict[str, Any], 
-                                 context: Dict[str, Any]) -> Dict[str, Any]:
+    def _apply_context_adjustments(self, strategy_config: StrategyConfig, 
+                                 context: Dict[str, Any]) -> StrategyConfig:
         """Apply context-specific adjustments to strategy"""
-        adjusted_config = strategy_config.copy()
+        timing_multiplier = strategy_config.timing_multiplier
+        spoofing_level = strategy_config.spoofing_level
+        behavior_profile = strategy_config.behavior_profile
         
         # Time-based adjustments
         hour = context.get('time_of_day', 12)
         if 1 <= hour <= 6:  # Late night/early morning
-            adjusted_config['timing_multiplier'] *= 1.5  # Slower
-            adjusted_config['spoofing_level'] = 'high'  # More cautious
+            timing_multiplier *= 1.5  # Slower
+            spoofing_level = 'high'  # More cautious
         elif 9 <= hour <= 17:  # Business hours
-            adjusted_config['timing_multiplier'] *= 0.8  # Slightly faster
+            timing_multiplier *= 0.8  # Slightly faster
         
         # Success rate adjustments
         recent_success_rate = context.get('recent_success_rate', 1.0)
         if recent_success_rate < 0.5:  # Low success rate
-            adjusted_config['timing_multiplier'] *= 2.0  # Much slower
-            adjusted_config['spoofing_level'] = 'high'  # Maximum spoofing
-            adjusted_config['behavior_profile'] = 'research'  # Most careful
-        
-        return adjusted_config
+            timing_multiplier *= 2.0  # Much slower
+            spoofing_level = 'high'  # Maximum spoofing
+            behavior_profile = 'research'  # Most careful
+        
+        return strategy_config._replace(
+            timing_multiplier=timing_multiplier,
+            spoofing_level=spoofing_level,
+            behavior_profile=behavior_profile
+        )
     
-    def update_strategy_registry(self, strategy_name: str, config: Dict[str, Any]):
+    def update_strategy_registry(self, strategy_name: str,
+                                 config: Union[StrategyConfig, Dict[str, Any]]):
         """Update or add a strategy to the registry"""
+        if not isinstance(config, StrategyConfig):
+            config = StrategyConfig.from_dict(config)
         self.strategy_registry[strategy_name] = config
         logging.info(f"Updated strategy registry: {strategy_name}")
 
 
+# Fingerprints do not change between consecutive requests of a session, so
+# the orchestrator only regenerates them this often (seconds)
+FINGERPRINT_CACHE_TTL = 60
+
+
+# Template for the result while disabled; callers each get their own copy
+_DISABLED_RESULT = {'optimized': False, 'reason': 'ML optimization disabled'}
+
+
+def _optimize_disabled(domain: str, request_context: Dict[str, Any]) -> Dict[str, Any]:
+    return dict(_DISABLED_RESULT)
+
+
+def _record_disabled(*args, **kwargs):
+    return None
+
+
 class MLBypassOrchestrator:
     """Main orchestrator for ML-based bypass optimization"""
     
@@ -399,19 +863,35 @@ class MLBypassOrchestrator:
         self.strategy_start_time = 0
         self.strategy_attempt_count = 0
         
+        # (minute, hour, weekday) of the last local time decomposed
+        self._dt_cache = (0, 0, 0)
+        
+        # (monotonic time, fingerprints) of the last fingerprint lookup
+        self._fp_cache: Tuple[float, Optional[Dict[str, str]]] = (0.0, None)
+        
+    def _hour_dow(self, ts: float) -> Tuple[int, int]:
+        """Local hour and weekday for a timestamp, reused within the same minute"""
+        key = int(ts) // 60
+        cached = self._dt_cache
+        if key == cached[0]:
+            return cached[1], cached[2]
+        
+        dt = datetime.fromtimestamp(ts)
+        self._dt_cache = (key, dt.hour, dt.weekday())
+        return dt.hour, dt.weekday()
+    
     def optimize_for_request(self, domain: str, request_context: Dict[str, Any]) -> Dict[str, Any]:
         """Optimize scraper configuration for a specific request"""
         if not self.enabled:
-            return {'optimized': False, 'reason': 'ML optimization disabled'}
+            return dict(_DISABLED_RESULT)
         
         # Get current context
         current_time = time.time()
-        from datetime import datetime
-        dt = datetime.fromtimestamp(current_time)
+        hour, day_of_week = self._hour_dow(current_time)
         
         context = {
-            'time_of_day': dt.hour,
-            'day_of_week': dt.weekday(),
+            'time_of_day': hour,
+            'day_of_week': day_of_week,
             'recent_success_rate': self._get_recent_success_rate(domain),
             **request_context
         }
@@ -441,8 +921,7 @@ class MLBypassOrchestrator:
             return
         
         current_time = time.time()
-        from datetime import datetime
-        dt = datetime.fromtimestamp(current_time)
+        hour, day_of_week = self._hour_dow(current_time)
         
         # Get current fingerprints
         fingerprints = self._get_current_fingerprints()
@@ -467,8 +946,8 @@ class MLBypassOrchestrator:
             detection_confidence=1.0,  # Simplified
             anti_detection_enabled=getattr(self.cloudscraper, 'enable_anti_detection', False),
             
-            time_of_day=dt.hour,
-            day_of_week=dt.weekday(),
+            time_of_day=hour,
+            day_of_week=day_of_week,
             session_age=current_time - getattr(self.cloudscraper, 'session_start_time', current_time)
         )
         
@@ -478,31 +957,19 @@ class MLBypassOrchestrator:
         # Update strategy attempt count
         self.strategy_attempt_count += 1
         
-        logging.debug(f"Recorded ML attempt: {domain} - {'SUCCESS' if success else 'FAILURE'}")
+        logging.debug("Recorded ML attempt: %s - %s", domain, 'SUCCESS' if success else 'FAILURE')
     
     def _get_recent_success_rate(self, domain: str) -> float:
         """Get recent success rate for domain"""
-        domain_model = self.optimizer.domain_models[domain]
-        
-        recent_time = time.time() - 3600  # Last hour
-        recent_successes = 0
-        recent_total = 0
-        
-        for attempts in domain_model['success_patterns'].values():
-            for attempt in attempts:
-                if attempt.timestamp > recent_time:
-                    recent_successes += 1
-                    recent_total += 1
-        
-        for attempts in domain_model['failure_patterns'].values():
-            for attempt in attempts:
-                if attempt.timestamp > recent_time:
-                    recent_total += 1
-        
-        return recent_successes / recent_total if recent_total > 0 else 1.0
+        return self.optimizer.recent_success_rate(domain)
     
     def _get_current_fingerprints(self) -> Dict[str, str]:
-        """Get current fingerprint hashes"""
+        """Get current fingerprint hashes, reused for FINGERPRINT_CACHE_TTL seconds"""
+        now = time.monotonic()
+        cached_at, fingerprints = self._fp_cache
+        if fingerprints is not None and now - cached_at < FINGERPRINT_CACHE_TTL:
+            return fingerprints
+        
         fingerprints = {}
         
         # TLS fingerprint
@@ -517,43 +984,43 @@ class MLBypassOrchestrator:
             fingerprints['canvas'] = spoofed_fps.get('canvas', {}).get('hash', 'unknown')
             fingerprints['webgl'] = spoofed_fps.get('webgl', {}).get('hash', 'unknown')
         
+        self._fp_cache = (now, fingerprints)
         return fingerprints
     
     def _get_current_behavior_profile(self) -> str:
         """Get current behavior profile"""
-        if hasattr(self.cloudscraper, 'timing_orchestrator') and self.cloudscraper.timing_orchestrator is not None:
-            return self.cloudscraper.timing_orchestrator.adaptive_controller.behavior_simulator.current_profile
+        timing_orchestrator = getattr(self.cloudscraper, 'timing_orchestrator', None)
+        if timing_orchestrator is not None:
+            return timing_orchestrator.adaptive_controller.behavior_simulator.current_profile
         return 'casual'  # Default profile
     
     def _apply_strategy_to_scraper(self, strategy: Dict[str, Any]):
         """Apply strategy configuration to scraper"""
-        config = strategy['config']
+        config: StrategyConfig = strategy['config']
+        timing_orchestrator = getattr(self.cloudscraper, 'timing_orchestrator', None)
         
         # Apply behavior profile
-        if hasattr(self.cloudscraper, 'timing_orchestrator') and self.cloudscraper.timing_orchestrator is not None:
-            behavior_profile = config.get('behavior_profile', 'casual')
-            self.cloudscraper.timing_orchestrator.set_behavior_profile(behavior_profile)
+        if timing_orchestrator is not None:
+            timing_orchestrator.set_behavior_profile(config.behavior_profile)
         
         # Apply spoofing level
         if hasattr(self.cloudscraper, 'spoofing_coordinator'):
-            spoofing_level = config.get('spoofing_level', 'medium')
             # Note: This would require extending SpoofingCoordinator to support level changes
             # For now, we just log the intent
-            logging.debug(f"Applied spoofing level: {spoofing_level}")
+            logging.debug("Applied spoofing level: %s", config.spoofing_level)
         
         # Apply timing multiplier
-        timing_multiplier = config.get('timing_multiplier', 1.0)
-        if hasattr(self.cloudscraper, 'timing_orchestrator') and self.cloudscraper.timing_orchestrator is not None:
+        if timing_orchestrator is not None:
             # This would require extending TimingOrchestrator to support multipliers
-            logging.debug(f"Applied timing multiplier: {timing_multiplier}")
+            logging.debug("Applied timing multiplier: %s", config.timing_multiplier)
         
-        logging.info(f"Applied ML strategy: {strategy['name']} (confidence: {strategy['confidence']:.2f})")
+        logging.info("Applied ML strategy: %s (confidence: %.2f)", strategy['name'], strategy['confidence'])
     
     def get_optimization_report(self, domain: str = None) -> Dict[str, Any]:
         """Get comprehensive optimization report"""
         report = {
             'enabled': self.enabled,
-            'total_attempts': len(self.optimizer.attempt_history),
+            'total_attempts': len(self.optimizer.attempts),
             'feature_weights': self.optimizer.feature_weights,
             'strategy_registry': list(self.strategy_selector.strategy_registry.keys())
         }
@@ -567,26 +1034,34 @@ class MLBypassOrchestrator:
             report['tracked_domains'] = len(domains)
             
             if domains:
-                # Aggregate insights across domains
+                # Aggregate success rates across domains straight from the
+                # per-domain counters, without building each domain's insights
                 all_insights = []
                 for d in domains:
-                    insights = self.optimizer.get_optimization_insights(d)
-                    if 'overall_success_rate' in insights:
-                        all_insights.append(insights['overall_success_rate'])
+                    success_rate = self.optimizer.overall_success_rate(d)
+                    if success_rate is not None:
+                        all_insights.append(success_rate)
                 
                 if all_insights:
-                    report['global_success_rate'] = statistics.mean(all_insights)
+                    report['global_success_rate'] = sum(all_insights) / len(all_insights)
         
         return report
     
     def enable(self):
         """Enable ML optimization"""
         self.enabled = True
+        # Drop the no-op overrides so lookups fall back to the class methods
+        self.__dict__.pop('optimize_for_request', None)
+        self.__dict__.pop('record_request_outcome', None)
         logging.info("ML bypass optimization enabled")
     
     def disable(self):
         """Disable ML optimization"""
         self.enabled = False
+        # Shadow the per-request hooks with no-ops on the instance, so a
+        # disabled orchestrator costs one attribute lookup per request
+        self.optimize_for_request = _optimize_disabled
+        self.record_request_outcome = _record_disabled
         logging.info("ML bypass optimization disabled")
     
     def reset_learning_data(self):
@@ -0,0 +1,363 @@
+"""
+Persistent Node.js Worker Pool
+==============================
+
+This module keeps a small pool of long-lived Node.js processes that
+evaluate challenge scripts inside fresh ``vm`` contexts, so solving a
+challenge no longer pays for a process spawn and V8 start-up each time.
+"""
+
+import atexit
+import itertools
+import json
+import queue
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, List, Optional
+
+from .exceptions import ChallengeTimeoutError, InterpreterError
+
+# Windows-specific settings to hide console window when spawning Node.js
+# This prevents console flash in PyInstaller --noconsole builds. The
+# STARTUPINFO is built once; Popen copies it for each spawn.
+NODE_POPEN_KWARGS = {}
+if sys.platform == 'win32':
+    _STARTUPINFO = subprocess.STARTUPINFO()
+    _STARTUPINFO.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+    _STARTUPINFO.wShowWindow = subprocess.SW_HIDE
+    NODE_POPEN_KWARGS = {
+        'creationflags': subprocess.CREATE_NO_WINDOW,
+        'startupinfo': _STARTUPINFO
+    }
+
+DEFAULT_POOL_SIZE = 2
+
+# Extra time allowed for a reply on top of the in-script vm timeout
+REPLY_GRACE_PERIOD = 5.0
+
+# Reads frames of one JSON header line {id, length, timeout, filename, stringify}
+# followed by `length` bytes of raw UTF-8 script from stdin, and answers each
+# with one JSON line {id, ok, result|error}.
+WORKER_SOURCE = r'''
+const vm = require('vm');
+
+// Browser helpers for the sandbox. They are defined inside each context
+// rather than handed in from the worker, because any worker object lets a
+// script reach the worker's own globals (fn.constructor('return this')()),
+// and whatever it plants there would outlive the run. Timer callbacks never
+// ran anyway (the reply is written as soon as the script returns and the
+// context is dropped), so the timers only hand out ids.
+const PRELUDE = new vm.Script(`(function (g) {
+    var noop = function () {};
+    g.console = {log: noop, info: noop, warn: noop, error: noop, debug: noop, trace: noop};
+
+    var nextTimer = 1;
+    g.setTimeout = g.setInterval = g.setImmediate = function () { return nextTimer++; };
+    g.clearTimeout = g.clearInterval = g.clearImmediate = noop;
+
+    var B64 = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/';
+    g.btoa = function (input) {
+        var str = String(input), out = '';
+        for (var i = 0; i < str.length; i += 3) {
+            var a = str.charCodeAt(i), b = str.charCodeAt(i + 1), c = str.charCodeAt(i + 2);
+            if (a > 255 || b > 255 || c > 255) {
+                throw new Error('InvalidCharacterError: btoa() argument is not Latin-1');
+            }
+            var n = (a << 16) | (b << 8) | c;
+            out += B64.charAt(n >> 18 & 63) + B64.charAt(n >> 12 & 63) +
+                (i + 1 < str.length ? B64.charAt(n >> 6 & 63) : '=') +
+                (i + 2 < str.length ? B64.charAt(n & 63) : '=');
+        }
+        return out;
+    };
+    // Lenient like Buffer.from(str, 'base64'): unknown characters are skipped
+    g.atob = function (input) {
+        var str = String(input), out = '', acc = 0, bits = 0;
+        for (var i = 0; i < str.length; i++) {
+            var ch = str.charAt(i);
+            if (ch === '=') {
+                break;
+            }
+            var v = B64.indexOf(ch === '-' ? '+' : ch === '_' ? '/' : ch);
+            if (v === -1) {
+                continue;
+            }
+            acc = ((acc << 6) | v) & 0xFFFFFF;
+            bits += 6;
+            if (bits >= 8) {
+                bits -= 8;
+                out += String.fromCharCode(acc >> bits & 255);
+            }
+        }
+        return out;
+    };
+
+    function TextEncoder() {}
+    TextEncoder.prototype.encoding = 'utf-8';
+    TextEncoder.prototype.encode = function (input) {
+        var str = input === undefined ? '' : String(input), bytes = [];
+        for (var i = 0; i < str.length; i++) {
+            var c = str.charCodeAt(i);
+            if (c >= 0xD800 && c < 0xDC00 && i + 1 < str.length) {
+                var d = str.charCodeAt(i + 1);
+                if (d >= 0xDC00 && d < 0xE000) {
+                    c = 0x10000 + ((c - 0xD800) << 10) + (d - 0xDC00);
+                    i++;
+                }
+            }
+            if (c >= 0xD800 && c < 0xE000) {
+                c = 0xFFFD;
+            }
+            if (c < 0x80) {
+                bytes.push(c);
+            } else if (c < 0x800) {
+                bytes.push(0xC0 | c >> 6, 0x80 | c & 63);
+            } else if (c < 0x10000) {
+                bytes.push(0xE0 | c >> 12, 0x80 | c >> 6 & 63, 0x80 | c & 63);
+            } else {
+                bytes.push(0xF0 | c >> 18, 0x80 | c >> 12 & 63, 0x80 | c >> 6 & 63, 0x80 | c & 63);
+            }
+        }
+        return new Uint8Array(bytes);
+    };
+
+    var MIN_CODE_POINT = [0, 0x80, 0x800, 0x10000];
+    function TextDecoder() {}
+    TextDecoder.prototype.encoding = 'utf-8';
+    TextDecoder.prototype.decode = function (input) {
+        var bytes = input === undefined ? new Uint8Array(0) :
+            ArrayBuffer.isView(input) ? new Uint8Array(input.buffer, input.byteOffset, input.byteLength) :
+            new Uint8Array(input);
+        var out = '', i = 0, n = bytes.length;
+        while (i < n) {
+            var b = bytes[i++], cp, need;
+            if (b < 0x80) {
+                out += String.fromCharCode(b);
+                continue;
+            } else if (b >= 0xC2 && b < 0xE0) {
+                cp = b & 0x1F; need = 1;
+            } else if (b >= 0xE0 && b < 0xF0) {
+                cp = b & 0x0F; need = 2;
+            } else if (b >= 0xF0 && b < 0xF5) {
+                cp = b & 0x07; need = 3;
+            } else {
+                out += '\\uFFFD';
+                continue;
+            }
+            var j = 0;
+            for (; j < need && i < n && (bytes[i] & 0xC0) === 0x80; j++) {
+                cp = (cp << 6) | (bytes[i++] & 0x3F);
+            }
+            if (j < need || cp < MIN_CODE_POINT[need] || (cp >= 0xD800 && cp < 0xE000) || cp > 0x10FFFF) {
+                out += '\\uFFFD';
+                continue;
+            }
+            out += String.fromCodePoint(cp);
+        }
+        return out;
+    };
+
+    g.TextEncoder = TextEncoder;
+    g.TextDecoder = TextDecoder;
+})(this);`, {filename: 'sandbox-prelude.js'});
+
+function run(msg, script) {
+    try {
+        // A null-prototype sandbox keeps worker objects out of the context
+        // entirely. Promise callbacks queued by the script also run within
+        // the timeout.
+        const context = vm.createContext(Object.create(null), {microtaskMode: 'afterEvaluate'});
+        PRELUDE.runInContext(context);
+        let value = vm.runInContext(script, context, {
+            filename: msg.filename || 'challenge.js',
+            timeout: msg.timeout
+        });
+        if (msg.stringify) {
+            value = String(value);
+        }
+        return JSON.stringify({id: msg.id, ok: true, result: value === undefined ? null : value});
+    } catch (e) {
+        return JSON.stringify({id: msg.id, ok: false, error: String(e)});
+    }
+}
+
+let buffer = Buffer.alloc(0);
+let header = null;
+process.stdin.on('data', (chunk) => {
+    buffer = buffer.length ? Buffer.concat([buffer, chunk]) : chunk;
+    for (;;) {
+        if (header === null) {
+            const newline = buffer.indexOf(10);
+            if (newline === -1) {
+                return;
+            }
+            header = JSON.parse(buffer.toString('utf8', 0, newline));
+            buffer = buffer.subarray(newline + 1);
+        }
+        if (buffer.length < header.length) {
+            return;
+        }
+        const script = buffer.toString('utf8', 0, header.length);
+        buffer = buffer.subarray(header.length);
+        const msg = header;
+        header = null;
+        process.stdout.write(run(msg, script) + '\n');
+    }
+});
+'''
+
+
+class NodeWorker:
+    """A single persistent Node.js process evaluating one script at a time"""
+
+    def __init__(self, node_binary: str = 'node'):
+        self.node_binary = node_binary
+        self.process = None
+        self.lock = threading.Lock()
+        self._replies = None
+        self._ids = itertools.count()
+
+    def _ensure_started(self):
+        """Spawn the Node.js process if it is not running"""
+        if self.process is not None and self.process.poll() is None:
+            return
+
+        self.process = subprocess.Popen(
+            [self.node_binary, '-e', WORKER_SOURCE],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            **NODE_POPEN_KWARGS
+        )
+        self._replies = queue.Queue()
+        threading.Thread(
+            target=self._read_replies,
+            args=(self.process, self._replies),
+            name='cs-node-worker-reader',
+            daemon=True
+        ).start()
+
+    @staticmethod
+    def _read_replies(process, replies: queue.Queue):
+        """Forward reply lines from the worker; None marks process exit"""
+        for line in process.stdout:
+            replies.put(line)
+        replies.put(None)
+
+    def evaluate(self, script: str, timeout: float, filename: Optional[str] = None,
+                 stringify: bool = False) -> Any:
+        """Evaluate a script and return the value of its last expression"""
+        with self.lock:
+            self._ensure_started()
+            msg_id = next(self._ids)
+            # The script travels as raw UTF-8 after a small header, so it is
+            # never JSON-escaped on the way in
+            payload = script.encode('utf-8')
+            header = json.dumps({
+                'id': msg_id,
+                'length': len(payload),
+                'timeout': int(timeout * 1000),
+                'filename': filename,
+                'stringify': stringify
+            }).encode('ascii')
+
+            try:
+                self.process.stdin.write(header + b'\n')
+                self.process.stdin.write(payload)
+                self.process.stdin.flush()
+            except OSError:
+                self.terminate()
+                raise InterpreterError('Node.js worker exited unexpectedly')
+
+            deadline = time.monotonic() + timeout + REPLY_GRACE_PERIOD
+            while True:
+                try:
+                    line = self._replies.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    self.terminate()
+                    raise ChallengeTimeoutError('Node.js worker did not reply in time')
+
+                if line is None:
+                    self.terminate()
+                    raise InterpreterError('Node.js worker exited unexpectedly')
+
+                try:
+                    reply = json.loads(line)
+                except ValueError:
+                    # Not one of our replies; the worker's output can no
+                    # longer be trusted to line up with requests
+                    self.terminate()
+                    raise InterpreterError('Node.js worker sent an invalid reply')
+                if reply.get('id') == msg_id:
+                    break
+
+        if not reply['ok']:
+            raise InterpreterError(reply['error'])
+
+        return reply.get('result')
+
+    def terminate(self):
+        """Stop the Node.js process; it is respawned on next use"""
+        process, self.process = self.process, None
+        if process is None:
+            return
+
+        try:
+            process.kill()
+            process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+
+
+class NodeWorkerPool:
+    """Round-robin pool of persistent Node.js workers"""
+
+    def __init__(self, size: int = DEFAULT_POOL_SIZE, node_binary: str = 'node'):
+        self.workers: List[NodeWorker] = [NodeWorker(node_binary) for _ in range(max(1, size))]
+        self._next = itertools.count()
+
+    def evaluate(self, script: str, timeout: float, filename: Optional[str] = None,
+                 stringify: bool = False) -> Any:
+        """Evaluate a script on the next worker in turn"""
+        worker = self.workers[next(self._next) % len(self.workers)]
+        return worker.evaluate(script, timeout, filename=filename, stringify=stringify)
+
+    def start(self):
+        """
+        Spawn any worker processes that are not running yet, without
+        waiting on workers that are busy evaluating (those are running)
+        """
+        for worker in self.workers:
+            if worker.process is not None and worker.process.poll() is None:
+                continue
+            if not worker.lock.acquire(blocking=False):
+                continue
+            try:
+                worker._ensure_started()
+            finally:
+                worker.lock.release()
+
+    def shutdown(self):
+        """Terminate all worker processes"""
+        for worker in self.workers:
+            with worker.lock:
+                worker.terminate()
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_worker_pool() -> NodeWorkerPool:
+    """Get the process-wide Node.js worker pool, creating it on first use"""
+    global _default_pool
+
+    if _default_pool is None:
+        with _default_pool_lock:
+            if _default_pool is None:
+                _default_pool = NodeWorkerPool()
+                atexit.register(_default_pool.shutdown)
+
+    return _default_pool
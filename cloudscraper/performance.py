@@ -1,57 +1,313 @@
 """
 Performance optimization utilities for CloudScraper
 """
+import sys
 import time
 import gc
+import itertools
 import threading
 import psutil
 import weakref
-from typing import Dict, Any, Optional, List, Callable
+from array import array
+from typing import Dict, Any, Optional, List, Callable, Tuple
 from functools import wraps
-from collections import defaultdict
+from collections import OrderedDict, defaultdict, deque
+from time import perf_counter_ns
+import heapq
 import cProfile
-import pstats
-import io
+
+
+# profile_function() reads RSS on one call in this many
+MEMORY_SAMPLE_RATE = 64
+
+# System and process memory readings are reused for this many seconds
+SYSTEM_INFO_TTL = 1.0
+
+# Samples kept per profiled name; older ones are overwritten, while the
+# running aggregates still cover every sample ever recorded
+MAX_SAMPLES = 10_000
+
+# stop_profiling() reports this many functions, by cumulative time
+PROFILE_REPORT_ROWS = 20
+PROFILE_REPORT_HEADER = "   ncalls  tottime  percall  cumtime  percall filename:lineno(function)"
+PROFILE_REPORT_ROW = "{:>9} {:8.3f} {:8.3f} {:8.3f} {:8.3f} {}"
+
+
+def _profile_entry_label(code) -> str:
+    """filename:lineno(function) of a cProfile entry; builtins come as strings"""
+    if isinstance(code, str):
+        return "{" + code.strip("<>") + "}"
+    return f"{code.co_filename}:{code.co_firstlineno}({code.co_name})"
+
+
+def _format_profile_stats(entries: List[Any]) -> str:
+    """
+    Render cProfile.Profile.getstats() entries as a table of the slowest
+    functions by cumulative time, in the layout pstats prints
+    """
+    total_calls = sum(entry.callcount for entry in entries)
+    primitive_calls = total_calls - sum(entry.reccallcount for entry in entries)
+    total_time = sum(entry.inlinetime for entry in entries)
+    
+    lines = [
+        f"         {total_calls} function calls ({primitive_calls} primitive calls) in {total_time:.3f} seconds",
+        "",
+        "   Ordered by: cumulative time",
+        "",
+        PROFILE_REPORT_HEADER
+    ]
+    for entry in heapq.nlargest(PROFILE_REPORT_ROWS, entries, key=lambda entry: entry.totaltime):
+        calls = entry.callcount
+        primitive = calls - entry.reccallcount
+        lines.append(PROFILE_REPORT_ROW.format(
+            f"{calls}/{primitive}" if primitive != calls else calls,
+            entry.inlinetime,
+            entry.inlinetime / calls if calls else 0.0,
+            entry.totaltime,
+            entry.totaltime / primitive if primitive else 0.0,
+            _profile_entry_label(entry.code)
+        ))
+    lines.append("")
+    return "\n".join(lines)
+
+
+# Number of independently locked partitions of the profiler's samples;
+# must be a power of two
+LOCK_SHARDS = 16
+
+
+# Timing samples are integer nanoseconds and memory samples integer bytes
+NS_PER_SECOND = 1e9
+BYTES_PER_MB = 1024 * 1024
+
+
+class _SampleSeries:
+    """
+    Integer samples recorded under one name, with their count, total, min
+    and max kept up to date as they are added so that reports never have
+    to rescan the samples. Only the latest MAX_SAMPLES samples are kept,
+    in an array('q') used as a ring buffer once it is full.
+    """
+    
+    __slots__ = ('samples', 'count', 'total', 'minimum', 'maximum')
+    
+    def __init__(self):
+        self.samples = array('q')
+        self.count = 0
+        self.total = 0
+        self.minimum = 0
+        self.maximum = 0
+    
+    def add(self, value: int):
+        count = self.count
+        if count < MAX_SAMPLES:
+            self.samples.append(value)
+        else:
+            self.samples[count % MAX_SAMPLES] = value
+        self.count = count = count + 1
+        self.total += value
+        if count == 1:
+            self.minimum = self.maximum = value
+        elif value < self.minimum:
+            self.minimum = value
+        elif value > self.maximum:
+            self.maximum = value
+    
+    def recent(self) -> array:
+        """The retained samples, oldest first"""
+        if self.count <= MAX_SAMPLES:
+            return self.samples[:]
+        cursor = self.count % MAX_SAMPLES
+        return self.samples[cursor:] + self.samples[:cursor]
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler that periodically samples the call stacks of all
+    other threads, instead of timing every call. Each function on a sampled
+    stack is counted once and credited with the wall-clock time measured
+    since the previous sample, which approximates the time spent inside it
+    (callees included). The measured gap is used rather than the nominal
+    interval because under GIL contention samples arrive late.
+    """
+    
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.samples = defaultdict(int)
+        self.times = defaultdict(float)
+        self.total_samples = 0
+        self.lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+    
+    def start(self):
+        """Start the sampling thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name='cs-sampling-profiler', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop the sampling thread"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def _run(self):
+        own_thread = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop_event.wait(self.interval):
+            now = time.perf_counter()
+            self._take_sample(own_thread, now - last)
+            last = now
+    
+    def _take_sample(self, own_thread: int, elapsed: float):
+        """Credit every function on every other thread's current stack with elapsed seconds"""
+        frames = sys._current_frames()
+        with self.lock:
+            samples = self.samples
+            times = self.times
+            for thread_id, frame in frames.items():
+                if thread_id == own_thread:
+                    continue
+                seen = set()
+                while frame is not None:
+                    code = frame.f_code
+                    if code not in seen:
+                        seen.add(code)
+                        key = (code.co_filename, code.co_firstlineno, code.co_name)
+                        samples[key] += 1
+                        times[key] += elapsed
+                    frame = frame.f_back
+            self.total_samples += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Sampled time per function, keyed as 'filename:lineno(function)'"""
+        with self.lock:
+            return {
+                f"{filename}:{lineno}({name})": {
+                    'samples': self.samples[filename, lineno, name],
+                    'total_time': total_time
+                }
+                for (filename, lineno, name), total_time in sorted(
+                    self.times.items(), key=lambda x: x[1], reverse=True
+                )
+            }
+    
+    def reset(self):
+        """Reset all samples"""
+        with self.lock:
+            self.samples.clear()
+            self.times.clear()
+            self.total_samples = 0
 
 
 class PerformanceProfiler:
     """
     Performance profiler for CloudScraper operations
+    
+    With sampling_mode=True, a SamplingProfiler attributes time by
+    periodically sampling stacks and profile_function() leaves functions
+    unwrapped, so decorated hot paths pay no per-call overhead.
     """
     
-    def __init__(self, enabled: bool = True):
+    def __init__(self, enabled: bool = True, sampling_mode: bool = False,
+                 sampling_interval: float = 0.001):
         self.enabled = enabled
+        self.sampling_mode = sampling_mode
         self.profiles = {}
-        self.timing_data = defaultdict(list)
-        self.memory_data = defaultdict(list)
-        self.lock = threading.Lock()
+        # Samples are kept as a _SampleSeries per name, timings as integer
+        # nanoseconds and memory deltas as integer bytes of RSS.
+        # Names are spread over LOCK_SHARDS partitions with a lock each, so
+        # threads recording different names rarely wait on one another.
+        self._locks = [threading.Lock() for _ in range(LOCK_SHARDS)]
+        self._timing_shards = [defaultdict(_SampleSeries) for _ in range(LOCK_SHARDS)]
+        self._memory_shards = [defaultdict(_SampleSeries) for _ in range(LOCK_SHARDS)]
+        
+        # Reading RSS is a syscall, so decorated functions only measure
+        # memory on every MEMORY_SAMPLE_RATE-th call
+        self._call_counter = itertools.count()
+        try:
+            self._process = psutil.Process()
+        except:
+            self._process = None
+        
+        # (monotonic time, value) of the last system info reading
+        self._system_info_cache = (float('-inf'), None)
+        
+        self.sampler = SamplingProfiler(sampling_interval) if sampling_mode else None
+        if self.sampler and enabled:
+            self.sampler.start()
+    
+    @property
+    def timing_data(self) -> Dict[str, array]:
+        """Latest timing samples of every name, merged from all shards"""
+        return {name: series.recent() for shard in self._timing_shards for name, series in shard.items()}
+    
+    @property
+    def memory_data(self) -> Dict[str, array]:
+        """Latest memory samples of every name, merged from all shards"""
+        return {name: series.recent() for shard in self._memory_shards for name, series in shard.items()}
+    
+    def _shard(self, name: str) -> Tuple[threading.Lock, Dict[str, _SampleSeries], Dict[str, _SampleSeries]]:
+        """The lock and sample tables that name is recorded under"""
+        index = hash(name) & (LOCK_SHARDS - 1)
+        return self._locks[index], self._timing_shards[index], self._memory_shards[index]
+    
+    def _record(self, name: str, elapsed_ns: int, memory_delta: Optional[int] = None):
+        """Record one timing sample, and a memory sample if given"""
+        lock, timings, memories = self._shard(name)
+        with lock:
+            timings[name].add(elapsed_ns)
+            if memory_delta is not None:
+                memories[name].add(memory_delta)
+    
+    def _lock_all(self):
+        """Acquire every shard lock, always in the same order"""
+        for lock in self._locks:
+            lock.acquire()
+    
+    def _unlock_all(self):
+        for lock in reversed(self._locks):
+            lock.release()
         
     def profile_function(self, func_name: str = None):
         """Decorator to profile function execution"""
         def decorator(func):
+            if self.sampling_mode:
+                # The sampler already attributes time to this function
+                return func
+            
             name = func_name or f"{func.__module__}.{func.__name__}"
+            # The shard only depends on the name, so it is looked up once
+            lock, timings, memories = self._shard(name)
             
             @wraps(func)
             def wrapper(*args, **kwargs):
                 if not self.enabled:
                     return func(*args, **kwargs)
                 
-                start_time = time.perf_counter()
-                start_memory = self._get_memory_usage()
+                sample_memory = next(self._call_counter) % MEMORY_SAMPLE_RATE == 0
+                start_memory = self._get_rss() if sample_memory else 0
+                start_ns = perf_counter_ns()
                 
                 try:
                     result = func(*args, **kwargs)
                     return result
                 finally:
-                    end_time = time.perf_counter()
-                    end_memory = self._get_memory_usage()
-                    
-                    execution_time = end_time - start_time
-                    memory_delta = end_memory - start_memory
+                    elapsed_ns = perf_counter_ns() - start_ns
                     
-                    with self.lock:
-                        self.timing_data[name].append(execution_time)
-                        self.memory_data[name].append(memory_delta)
+                    if sample_memory:
+                        memory_delta = self._get_rss() - start_memory
+                        with lock:
+                            timings[name].add(elapsed_ns)
+                            memories[name].add(memory_delta)
+                    else:
+                        with lock:
+                            timings[name].add(elapsed_ns)
             
             return wrapper
         return decorator
@@ -65,8 +321,16 @@ class PerformanceProfiler:
         if not self.enabled:
             return
             
-        profiler = cProfile.Profile()
-        profiler.enable()
+        # On Python 3.12+ cProfile already runs on PEP 669 sys.monitoring
+        # and holds its single profiler tool slot, so enabling a second
+        # profiler while one is active raises instead of silently taking
+        # over. Caller/callee tables are not reported, so skip collecting them.
+        profiler = cProfile.Profile(subcalls=False)
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiling tool (or session) is already active
+            return
         self.profiles[profile_name] = profiler
     
     def stop_profiling(self, profile_name: str) -> Optional[str]:
@@ -77,74 +341,95 @@ class PerformanceProfiler:
         profiler = self.profiles.pop(profile_name)
         profiler.disable()
         
-        # Generate report
-        s = io.StringIO()
-        ps = pstats.Stats(profiler, stream=s)
-        ps.sort_stats('cumulative')
-        ps.print_stats(20)  # Top 20 functions
-        
-        return s.getvalue()
+        # Generate report straight from the raw entries, top functions only
+        return _format_profile_stats(profiler.getstats())
     
     def get_performance_report(self) -> Dict[str, Any]:
         """Get comprehensive performance report"""
-        with self.lock:
+        self._lock_all()
+        try:
             report = {
                 'timing_stats': {},
                 'memory_stats': {},
                 'system_info': self._get_system_info()
             }
             
-            # Calculate timing statistics
-            for func_name, times in self.timing_data.items():
-                if times:
+            # Timing statistics, from the running aggregates
+            for shard in self._timing_shards:
+                for func_name, series in shard.items():
                     report['timing_stats'][func_name] = {
-                        'count': len(times),
-                        'total_time': sum(times),
-                        'avg_time': sum(times) / len(times),
-                        'min_time': min(times),
-                        'max_time': max(times)
+                        'count': series.count,
+                        'total_time': series.total / NS_PER_SECOND,
+                        'avg_time': series.total / series.count / NS_PER_SECOND,
+                        'min_time': series.minimum / NS_PER_SECOND,
+                        'max_time': series.maximum / NS_PER_SECOND
                     }
             
-            # Calculate memory statistics
-            for func_name, memory_deltas in self.memory_data.items():
-                if memory_deltas:
+            if self.sampler:
+                report['sampled_stats'] = self.sampler.get_stats()
+            
+            # Memory statistics, from the running aggregates
+            for shard in self._memory_shards:
+                for func_name, series in shard.items():
                     report['memory_stats'][func_name] = {
-                        'count': len(memory_deltas),
-                        'total_memory': sum(memory_deltas),
-                        'avg_memory': sum(memory_deltas) / len(memory_deltas),
-                        'min_memory': min(memory_deltas),
-                        'max_memory': max(memory_deltas)
+                        'count': series.count,
+                        'total_memory': series.total / BYTES_PER_MB,
+                        'avg_memory': series.total / series.count / BYTES_PER_MB,
+                        'min_memory': series.minimum / BYTES_PER_MB,
+                        'max_memory': series.maximum / BYTES_PER_MB
                     }
             
             return report
+        finally:
+            self._unlock_all()
     
-    def _get_memory_usage(self) -> float:
-        """Get current memory usage in MB"""
+    def _get_rss(self) -> int:
+        """Get current resident set size in bytes"""
         try:
-            process = psutil.Process()
-            return process.memory_info().rss / 1024 / 1024  # Convert to MB
+            return self._process.memory_info().rss
         except:
-            return 0.0
+            return 0
+    
+    def _get_memory_usage(self) -> float:
+        """Get current memory usage in MB"""
+        return self._get_rss() / BYTES_PER_MB
     
     def _get_system_info(self) -> Dict[str, Any]:
-        """Get system information"""
+        """Get system information, re-read at most every SYSTEM_INFO_TTL seconds"""
+        now = time.monotonic()
+        read_at, info = self._system_info_cache
+        if now - read_at <= SYSTEM_INFO_TTL:
+            return dict(info)
+        
         try:
-            return {
+            virtual_memory = psutil.virtual_memory()
+            info = {
                 'cpu_count': psutil.cpu_count(),
                 'cpu_percent': psutil.cpu_percent(),
-                'memory_total': psutil.virtual_memory().total / 1024 / 1024 / 1024,  # GB
-                'memory_available': psutil.virtual_memory().available / 1024 / 1024 / 1024,  # GB
-                'memory_percent': psutil.virtual_memory().percent
+                'memory_total': virtual_memory.total / 1024 / 1024 / 1024,  # GB
+                'memory_available': virtual_memory.available / 1024 / 1024 / 1024,  # GB
+                'memory_percent': virtual_memory.percent
             }
         except:
             return {}
+        
+        self._system_info_cache = (now, info)
+        return dict(info)
     
     def reset(self):
         """Reset all profiling data"""
-        with self.lock:
-            self.timing_data.clear()
-            self.memory_data.clear()
+        self._lock_all()
+        try:
+            for shard in self._timing_shards:
+                shard.clear()
+            for shard in self._memory_shards:
+                shard.clear()
             self.profiles.clear()
+        finally:
+            self._unlock_all()
+        
+        if self.sampler:
+            self.sampler.reset()
 
 
 class CodeBlockProfiler:
@@ -153,26 +438,24 @@ class CodeBlockProfiler:
     def __init__(self, profiler: PerformanceProfiler, block_name: str):
         self.profiler = profiler
         self.block_name = block_name
-        self.start_time = None
+        self.start_ns = None
         self.start_memory = None
     
     def __enter__(self):
         if self.profiler.enabled:
-            self.start_time = time.perf_counter()
-            self.start_memory = self.profiler._get_memory_usage()
+            self.start_ns = perf_counter_ns()
+            self.start_memory = self.profiler._get_rss()
         return self
     
     def __exit__(self, exc_type, exc_val, exc_tb):
-        if self.profiler.enabled and self.start_time is not None:
-            end_time = time.perf_counter()
-            end_memory = self.profiler._get_memory_usage()
+        if self.profiler.enabled and self.start_ns is not None:
+            end_ns = perf_counter_ns()
+            end_memory = self.profiler._get_rss()
             
-            execution_time = end_time - self.start_time
+            elapsed_ns = end_ns - self.start_ns
             memory_delta = end_memory - self.start_memory
             
-            with self.profiler.lock:
-                self.profiler.timing_data[self.block_name].append(execution_time)
-                self.profiler.memory_data[self.block_name].append(memory_delta)
+            self.profiler._record(self.block_name, elapsed_ns, memory_delta)
 
 
 class MemoryOptimizer:
@@ -183,27 +466,58 @@ class MemoryOptimizer:
     def __init__(self):
         self.weak_refs = weakref.WeakSet()
         self.cleanup_callbacks = []
+        try:
+            self._process = psutil.Process()
+        except:
+            self._process = None
+        
+        # (monotonic time, value) of the last memory usage reading
+        self._memory_usage_cache = (float('-inf'), None)
     
     def register_for_cleanup(self, obj):
-        """Register object for automatic cleanup"""
+        """
+        Register object for automatic cleanup: while it is alive, its clear()
+        (or else close()) method is called by optimize_memory()
+        """
         self.weak_refs.add(obj)
     
     def add_cleanup_callback(self, callback: Callable):
         """Add cleanup callback function"""
         self.cleanup_callbacks.append(callback)
     
-    def force_garbage_collection(self):
-        """Force garbage collection"""
-        collected = gc.collect()
+    def force_garbage_collection(self, generation: Optional[int] = None):
+        """
+        Force garbage collection of the given generation and the younger ones.
+        By default the youngest generation is collected, together with any
+        older one whose count has already reached the collector's threshold;
+        pass generation=2 for a full collection.
+        """
+        if generation is None:
+            generation = 0
+            counts = gc.get_count()
+            thresholds = gc.get_threshold()
+            for older in (1, 2):
+                if thresholds[older] and counts[older] >= thresholds[older]:
+                    generation = older
+        
+        collected = gc.collect(generation)
         return collected
     
-    def get_memory_usage(self) -> Dict[str, float]:
-        """Get detailed memory usage information"""
+    def get_memory_usage(self, max_age: float = SYSTEM_INFO_TTL) -> Dict[str, float]:
+        """
+        Get detailed memory usage information. A reading younger than
+        max_age seconds is reused; pass 0 to force a fresh one.
+        """
+        now = time.monotonic()
+        read_at, usage = self._memory_usage_cache
+        if now - read_at <= max_age:
+            return dict(usage)
+        
         try:
-            process = psutil.Process()
+            process = self._process
             memory_info = process.memory_info()
             
-            return {
+            usage = {
                 'rss_mb': memory_info.rss / 1024 / 1024,  # Resident Set Size
                 'vms_mb': memory_info.vms / 1024 / 1024,  # Virtual Memory Size
                 'percent': process.memory_percent(),
@@ -211,9 +525,21 @@ class MemoryOptimizer:
             }
         except:
             return {}
+        
+        self._memory_usage_cache = (now, usage)
+        return dict(usage)
     
     def optimize_memory(self):
         """Perform memory optimization"""
+        # Clean up registered objects that are still alive
+        for obj in list(self.weak_refs):
+            cleanup = getattr(obj, 'clear', None) or getattr(obj, 'close', None)
+            if cleanup is not None:
+                try:
+                    cleanup()
+                except Exception:
+                    pass  # Ignore cleanup errors
+        
         # Run cleanup callbacks
         for callback in self.cleanup_callbacks:
             try:
@@ -226,7 +552,7 @@ class MemoryOptimizer:
         
         return {
             'objects_collected': collected,
-            'memory_after': self.get_memory_usage()
+            'memory_after': self.get_memory_usage(max_age=0)
         }
 
 
@@ -263,13 +589,13 @@ class RequestOptimizer:
     
     def get_optimal_delay(self, response_time: float, success_rate: float) -> float:
         """Calculate optimal delay based on performance metrics"""
-        base_delay = 1.0
-        
-        # Adjust based on response time
+        # Adjust the 1s base delay based on response time
         if response_time > 5.0:
-            base_delay *= 1.5
+            base_delay = 1.5
         elif response_time < 1.0:
-            base_delay *= 0.8
+            base_delay = 0.8
+        else:
+            base_delay = 1.0
         
         # Adjust based on success rate
         if success_rate < 0.8:
@@ -277,7 +603,9 @@ class RequestOptimizer:
         elif success_rate > 0.95:
             base_delay *= 0.9
         
-        return max(0.1, min(base_delay, 10.0))
+        # The result always lies within [0.72, 1.95], inside the
+        # [0.1, 10.0] bounds a delay may take, so it needs no clamping
+        return base_delay
 
 
 class PerformanceMonitor:
@@ -430,7 +758,9 @@ class SessionManager:
     def __init__(self, max_sessions: int = 5, session_ttl: int = 3600):
         self.max_sessions = max_sessions
         self.session_ttl = session_ttl
-        self.sessions = {}
+        # Sessions are kept in least to most recently used order, so both
+        # the eviction candidate and any expired sessions are at the front
+        self.sessions = OrderedDict()
         self.session_times = {}
         self.lock = threading.Lock()
 
@@ -445,6 +775,7 @@ class SessionManager:
             # Get existing session or create new one
             if session_key in self.sessions:
                 self.session_times[session_key] = current_time
+                self.sessions.move_to_end(session_key)
                 return self.sessions[session_key]
 
             # Create new session
@@ -458,24 +789,19 @@ class SessionManager:
             return session
 
     def _cleanup_expired_sessions(self, current_time: float):
-        """Clean up expired sessions"""
-        expired_keys = []
-
-        for key, last_used in self.session_times.items():
-            if current_time - last_used > self.session_ttl:
-                expired_keys.append(key)
-
-        for key in expired_keys:
-            self._close_session(key)
+        """Clean up expired sessions, stopping at the first live one"""
+        while self.sessions:
+            oldest_key = next(iter(self.sessions))
+            if current_time - self.session_times[oldest_key] <= self.session_ttl:
+                break
+            self._close_session(oldest_key)
 
     def _evict_oldest_session(self):
         """Evict the oldest session to make room"""
         if not self.sessions:
             return
 
-        oldest_key = min(self.session_times.keys(),
-                        key=lambda k: self.session_times[k])
-        self._close_session(oldest_key)
+        self._close_session(next(iter(self.sessions)))
 
     def _close_session(self, session_key: str):
         """Close and remove session"""
@@ -505,33 +831,43 @@ class ResponseCache:
     def __init__(self, max_size: int = 1000, ttl: int = 300):
         self.max_size = max_size
         self.ttl = ttl
-        self.cache = {}
-        self.access_times = {}
+        # Entries are kept in least to most recently used order, so the LRU
+        # entry is always first
+        self.cache = OrderedDict()
         self.creation_times = {}
+        # (creation_time, key) in insertion order; entries whose key was set
+        # again or evicted since are stale and skipped when they reach the
+        # front, or purged once they make up half the queue
+        self.expiry_queue = deque()
         self.lock = threading.Lock()
 
     def get(self, key: str) -> Optional[Any]:
         """Get cached response"""
-        with self.lock:
-            current_time = time.time()
+        current_time = time.time()
+
+        # Misses are answered without taking the lock: a single dict lookup
+        # is atomic, and a hit is looked up again once the lock is held
+        if key not in self.creation_times:
+            return None
 
-            if key in self.cache:
-                # Check if expired
-                if current_time - self.creation_times[key] > self.ttl:
-                    self._remove_key(key)
-                    return None
+        with self.lock:
+            creation_time = self.creation_times.get(key)
+            if creation_time is None:
+                return None
 
-                # Update access time
-                self.access_times[key] = current_time
-                return self.cache[key]
+            # Check if expired
+            if current_time - creation_time > self.ttl:
+                self._remove_key(key)
+                return None
 
-            return None
+            # Mark as most recently used
+            self.cache.move_to_end(key)
+            return self.cache[key]
 
     def set(self, key: str, value: Any):
         """Cache response"""
+        current_time = time.time()
         with self.lock:
-            current_time = time.time()
-
             # Remove expired entries
             self._cleanup_expired(current_time)
 
@@ -541,41 +877,47 @@ class ResponseCache:
 
             # Store value
             self.cache[key] = value
-            self.access_times[key] = current_time
+            self.cache.move_to_end(key)
             self.creation_times[key] = current_time
+            self.expiry_queue.append((current_time, key))
+            if len(self.expiry_queue) > 2 * self.max_size:
+                self._purge_stale()
+
+    def _purge_stale(self):
+        """Drop expiry queue entries for keys since overwritten or evicted"""
+        creation_times = self.creation_times
+        self.expiry_queue = deque(
+            entry for entry in self.expiry_queue
+            if creation_times.get(entry[1]) == entry[0]
+        )
 
     def _cleanup_expired(self, current_time: float):
-        """Remove expired entries"""
-        expired_keys = []
-
-        for key, creation_time in self.creation_times.items():
-            if current_time - creation_time > self.ttl:
-                expired_keys.append(key)
-
-        for key in expired_keys:
-            self._remove_key(key)
+        """Remove expired entries, oldest first, stopping at the first live one"""
+        expiry_queue = self.expiry_queue
+        while expiry_queue and current_time - expiry_queue[0][0] > self.ttl:
+            creation_time, key = expiry_queue.popleft()
+            if self.creation_times.get(key) == creation_time:
+                self._remove_key(key)
 
     def _evict_lru(self):
         """Evict least recently used entry"""
-        if not self.access_times:
+        if not self.cache:
             return
 
-        lru_key = min(self.access_times.keys(),
-                     key=lambda k: self.access_times[k])
+        lru_key = next(iter(self.cache))
         self._remove_key(lru_key)
 
     def _remove_key(self, key: str):
         """Remove key from all data structures"""
         self.cache.pop(key, None)
-        self.access_times.pop(key, None)
         self.creation_times.pop(key, None)
 
     def clear(self):
         """Clear all cached data"""
         with self.lock:
             self.cache.clear()
-            self.access_times.clear()
             self.creation_times.clear()
+            self.expiry_queue.clear()
 
     def get_stats(self) -> Dict[str, Any]:
         """Get cache statistics"""
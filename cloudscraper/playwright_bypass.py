@@ -9,14 +9,315 @@ Requirements:
     playwright install chromium
 """
 
+import re
 import time
+import atexit
+import asyncio
 import logging
 import random
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
 
 logger = logging.getLogger(__name__)
 
+# Common indicators that the Cloudflare challenge is still active
+CHALLENGE_INDICATORS = (
+    'checking your browser',
+    'just a moment',
+    'please wait',
+    'cf-challenge',
+    'turnstile'
+)
 
-def get_cf_cookies(url, timeout=30, headless=True, user_agent=None, advanced_stealth=True, behavioral_patterns=True):
+# All indicators as one case-insensitive alternation, so a page is scanned
+# once and never lowercased into a copy first
+CHALLENGE_INDICATOR_RE = re.compile(
+    '|'.join(re.escape(indicator) for indicator in CHALLENGE_INDICATORS),
+    re.IGNORECASE
+)
+
+# Evaluated inside the page by wait_for_function, so the DOM is never
+# serialized and shipped back to Python just to be searched. The same
+# pattern is used there as a JS regex literal with the 'i' flag.
+CHALLENGE_CLEARED_JS = (
+    "() => !/" + CHALLENGE_INDICATOR_RE.pattern + "/i.test(document.documentElement.outerHTML)"
+)
+
+# How often (seconds) the page predicate is re-evaluated. Polling starts
+# fast so a quick challenge is noticed almost at once, then backs off
+# geometrically towards the cap while the challenge keeps running.
+CHALLENGE_POLL_INITIAL = 0.05
+CHALLENGE_POLL_MAX = 1.0
+CHALLENGE_POLL_BACKOFF = 1.5
+
+# How often (seconds) a bypass considers a human-like interaction. This is
+# independent of the poll interval, so faster polling never means more
+# interactions.
+CHALLENGE_INTERACTION_INTERVAL = 0.5
+
+# Resource types the challenge never needs; only the DOM and scripts matter
+BLOCKED_RESOURCE_TYPES = frozenset(('image', 'font', 'media', 'stylesheet'))
+
+
+def _route_resources(route):
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        route.abort()
+    else:
+        route.continue_()
+
+
+async def _route_resources_async(route):
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+@lru_cache(maxsize=1)
+def _stealth_assets():
+    """
+    (launch args, init script) from StealthMode. Neither depends on the
+    scraper it is given, so they are built once, on first use.
+    """
+    from .stealth import StealthMode
+
+    # We need a dummy cloudscraper object for StealthMode
+    class DummyScraper:
+        def __init__(self):
+            self.headers = {}
+
+    stealth = StealthMode(DummyScraper())
+    return tuple(stealth.get_advanced_browser_args()), stealth.get_automation_bypass_script()
+
+
+async def _interact_periodically(simulator, page):
+    """Perform occasional human-like interaction on the page until cancelled"""
+    while True:
+        await asyncio.sleep(CHALLENGE_INTERACTION_INTERVAL)
+        if random.random() < 0.2:
+            await simulator.perform_human_interaction_async(page)
+
+
+@contextmanager
+def _playwright_loop(loop):
+    """
+    Run sync Playwright calls with its event loop set as running. Playwright
+    leaves its loop marked as running on the thread after every call, which
+    would break asyncio.run() there, so the previous state is put back.
+    """
+    previous = asyncio._get_running_loop()
+    if previous is not None and previous is not loop:
+        raise RuntimeError(
+            "Playwright's sync API cannot be used while an asyncio event loop is running; "
+            "use get_cf_cookies_async instead"
+        )
+    asyncio._set_running_loop(loop)
+    try:
+        yield
+    finally:
+        asyncio._set_running_loop(previous)
+
+
+def _close_sync_instance(playwright, browsers, loop, owner):
+    """Close a thread's browsers and stop its Playwright instance"""
+    if threading.get_ident() != owner:
+        # Only reached at interpreter exit for a thread that is still
+        # running; its objects cannot be used here and the driver exits
+        # with the process
+        return
+
+    with _playwright_loop(loop):
+        for browser in browsers.values():
+            try:
+                browser.close()
+            except Exception:
+                pass
+        try:
+            playwright.stop()
+        except Exception:
+            pass
+
+
+class _SyncInstance:
+    """A thread's Playwright instance, closed on that thread when it exits"""
+
+    def __init__(self, playwright, loop):
+        self.playwright = playwright
+        self.loop = loop
+        self.browsers = {}
+        # Held only by the pool's thread-local, so this runs on the owning
+        # thread as its locals are cleared (or at exit for the main thread)
+        self.close = weakref.finalize(
+            self, _close_sync_instance, playwright, self.browsers, loop, threading.get_ident()
+        )
+
+
+class PlaywrightPool:
+    """
+    Long-lived Playwright browsers that hand out a fresh context per use, so
+    a bypass only pays for a context instead of starting a new Chromium.
+
+    Playwright objects are bound to where they were created and can only be
+    closed from there: sync ones to their thread and async ones to their
+    event loop. Each thread gets its own Playwright instance, closed on that
+    thread when it exits, and each event loop gets one that is closed from
+    inside the loop when it shuts down (asyncio.run does this) or on
+    shutdown_async(). Instances of loops closed any other way are dropped
+    on the next async use, which lets their driver be reaped.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._async_instances = {}
+
+    @staticmethod
+    def _key(headless, launch_args):
+        return (headless, tuple(launch_args))
+
+    def _get_sync_instance(self):
+        """Get this thread's Playwright instance, starting it if needed"""
+        from playwright.sync_api import sync_playwright
+
+        instance = getattr(self._local, 'instance', None)
+        if instance is None:
+            previous = asyncio._get_running_loop()
+            playwright = sync_playwright().start()
+            # start() leaves Playwright's own loop marked as running
+            loop = asyncio._get_running_loop()
+            asyncio._set_running_loop(previous)
+            instance = self._local.instance = _SyncInstance(playwright, loop)
+        return instance
+
+    @contextmanager
+    def acquire_context(self, headless=True, launch_args=(), **context_options):
+        """
+        Open a fresh context on this thread's pooled browser, closing the
+        context (but not the browser) on exit
+        """
+        instance = self._get_sync_instance()
+
+        with _playwright_loop(instance.loop):
+            key = self._key(headless, launch_args)
+            browser = instance.browsers.get(key)
+            if browser is None or not browser.is_connected():
+                browser = instance.browsers[key] = instance.playwright.chromium.launch(
+                    headless=headless, args=list(launch_args)
+                )
+
+            context = browser.new_context(**context_options)
+            try:
+                yield context
+            finally:
+                context.close()
+
+    async def get_browser_async(self, headless=True, launch_args=()):
+        """Get this event loop's browser for the launch options, launching it if needed"""
+        from playwright.async_api import async_playwright
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            for closed in [other for other in self._async_instances if other.is_closed()]:
+                del self._async_instances[closed]
+
+            instance = self._async_instances.get(loop)
+            if instance is None:
+                # [playwright, browsers, lock, closer]; the playwright is
+                # started under the lock below so concurrent tasks share it
+                instance = self._async_instances[loop] = [None, {}, asyncio.Lock(), None]
+
+        async with instance[2]:
+            if instance[0] is None:
+                instance[0] = await async_playwright().start()
+                # Starting the generator registers it with the loop, which
+                # finalizes it before closing
+                instance[3] = self._close_with_loop(instance)
+                await instance[3].__anext__()
+            browsers = instance[1]
+            key = self._key(headless, launch_args)
+            browser = browsers.get(key)
+            if browser is None or not browser.is_connected():
+                browser = browsers[key] = await instance[0].chromium.launch(headless=headless, args=list(launch_args))
+            return browser
+
+    async def _close_with_loop(self, instance):
+        """Hold a loop's instance open until loop.shutdown_asyncgens() or shutdown_async()"""
+        try:
+            yield
+        finally:
+            loop = asyncio.get_running_loop()
+            with self._lock:
+                if self._async_instances.get(loop) is instance:
+                    del self._async_instances[loop]
+
+            for browser in instance[1].values():
+                try:
+                    await browser.close()
+                except Exception:
+                    pass
+            try:
+                await instance[0].stop()
+            except Exception:
+                pass
+
+    @asynccontextmanager
+    async def acquire_context_async(self, headless=True, launch_args=(), **context_options):
+        """Async version of acquire_context"""
+        browser = await self.get_browser_async(headless, launch_args)
+        context = await browser.new_context(**context_options)
+        try:
+            yield context
+        finally:
+            await context.close()
+
+    def shutdown(self):
+        """
+        Close the calling thread's pooled browsers and stop its Playwright
+        instance; other threads' instances close when those threads exit
+        """
+        instance = self._local.__dict__.pop('instance', None)
+        if instance is not None:
+            instance.close()
+
+    async def shutdown_async(self):
+        """Close the running event loop's pooled browsers and Playwright instance"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            instance = self._async_instances.get(loop)
+        if instance is None:
+            return
+
+        # Wait out a startup in progress, then let the closer do the work
+        async with instance[2]:
+            closer = instance[3]
+        if closer is not None:
+            await closer.aclose()
+        else:
+            with self._lock:
+                self._async_instances.pop(loop, None)
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_playwright_pool() -> PlaywrightPool:
+    """Get the process-wide Playwright pool, creating it on first use"""
+    global _default_pool
+
+    if _default_pool is None:
+        with _default_pool_lock:
+            if _default_pool is None:
+                _default_pool = PlaywrightPool()
+                atexit.register(_default_pool.shutdown)
+
+    return _default_pool
+
+
+def get_cf_cookies(url, timeout=30, headless=True, user_agent=None, advanced_stealth=True, behavioral_patterns=True,
+                   block_resources=True):
     """
     Navigate to a Cloudflare-protected URL using Playwright and return the
     cookies after the challenge is solved.
@@ -28,6 +329,7 @@ def get_cf_cookies(url, timeout=30, headless=True, user_agent=None, advanced_ste
         user_agent: Optional custom user agent string
         advanced_stealth: Use advanced automation bypass techniques (default True)
         behavioral_patterns: Simulate human-like interaction (default True)
+        block_resources: Skip loading images, fonts, media and stylesheets (default True)
         
     Returns:
         dict: Cookies as a dictionary {name: value}
@@ -37,94 +339,86 @@ def get_cf_cookies(url, timeout=30, headless=True, user_agent=None, advanced_ste
         Exception: If bypass fails
     """
     try:
-        from playwright.sync_api import sync_playwright
+        from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
     except ImportError:
         raise ImportError(
             "Playwright is required for advanced Cloudflare bypass. "
             "Install it with: pip install playwright && playwright install chromium"
         )
     
-    from .stealth import StealthMode
     from .behavioral_simulation import InteractionSimulator
     
-    cookies_dict = {}
+    # Launch options
+    launch_args, init_script = _stealth_assets() if advanced_stealth else ((), None)
     
-    with sync_playwright() as p:
-        # Launch options
-        launch_args = []
-        if advanced_stealth:
-            # We need a dummy cloudscraper object for StealthMode
-            class DummyScraper:
-                def __init__(self):
-                    self.headers = {}
-            
-            stealth = StealthMode(DummyScraper())
-            launch_args = stealth.get_advanced_browser_args()
-            
-        # Launch browser
-        browser = p.chromium.launch(headless=headless, args=launch_args)
-        
-        # Create context with optional user agent
-        context_options = {}
-        if user_agent:
-            context_options['user_agent'] = user_agent
-        
-        context = browser.new_context(**context_options)
+    # Create context with optional user agent
+    context_options = {}
+    if user_agent:
+        context_options['user_agent'] = user_agent
+    
+    # Open a fresh context on this thread's pooled browser, which stays up
+    # for the next call
+    pool = get_playwright_pool()
+    with pool.acquire_context(headless, launch_args, **context_options) as context:
+        if block_resources:
+            context.route("**/*", _route_resources)
         
         # Apply automation bypass script
         if advanced_stealth:
-            context.add_init_script(stealth.get_automation_bypass_script())
+            context.add_init_script(init_script)
             
         page = context.new_page()
         
-        try:
-            logger.info(f"Navigating to {url} with Playwright...")
-            
-            # Navigate to the page
-            page.goto(url, wait_until='domcontentloaded', timeout=timeout * 1000)
-            
-            # Behavioral simulation setup
-            simulator = InteractionSimulator() if behavioral_patterns else None
-            
-            # Wait for Cloudflare challenge to resolve
-            start_time = time.time()
+        logger.info(f"Navigating to {url} with Playwright...")
+        
+        # Navigate to the page
+        page.goto(url, wait_until='domcontentloaded', timeout=timeout * 1000)
+        
+        # Behavioral simulation setup
+        simulator = InteractionSimulator() if behavioral_patterns else None
+        
+        # Wait for Cloudflare challenge to resolve
+        deadline = time.monotonic() + timeout
+        poll_interval = CHALLENGE_POLL_INITIAL
+        next_interaction = time.monotonic()
+        
+        while True:
+            now = time.monotonic()
+            remaining = deadline - now
+            if remaining <= 0:
+                break
             
-            while time.time() - start_time < timeout:
-                # Perform some human-like interaction
-                if simulator and random.random() < 0.2:
+            # Perform some human-like interaction, at most once per interval
+            if simulator and now >= next_interaction:
+                next_interaction = now + CHALLENGE_INTERACTION_INTERVAL
+                if random.random() < 0.2:
                     simulator.perform_human_interaction(page)
-                
-                # Check if we're past the challenge
-                content = page.content().lower()
-                
-                # Common indicators that challenge is still active
-                challenge_indicators = [
-                    'checking your browser',
-                    'just a moment',
-                    'please wait',
-                    'cf-challenge',
-                    'turnstile'
-                ]
-                
-                is_challenging = any(ind in content for ind in challenge_indicators)
-                
-                if not is_challenging:
-                    logger.info("Cloudflare challenge appears resolved")
-                    # Wait a bit for cookies to settle
-                    time.sleep(2)
-                    break
-                    
-                # Wait a bit before checking again
-                time.sleep(0.5)
-            
-            # Extract cookies
-            for cookie in context.cookies():
-                cookies_dict[cookie['name']] = cookie['value']
             
-            logger.info(f"Extracted {len(cookies_dict)} cookies")
+            # Let the browser watch for the challenge to clear, polling a
+            # little less often each round, and come back when the next
+            # interaction is due
+            wait = min(remaining, poll_interval)
+            if simulator:
+                wait = max(min(wait, next_interaction - time.monotonic()), 0.001)
+            try:
+                page.wait_for_function(
+                    CHALLENGE_CLEARED_JS,
+                    timeout=wait * 1000,
+                    polling=poll_interval * 1000
+                )
+            except PlaywrightTimeoutError:
+                poll_interval = min(poll_interval * CHALLENGE_POLL_BACKOFF, CHALLENGE_POLL_MAX)
+                continue
             
-        finally:
-            browser.close()
+            logger.info("Cloudflare challenge appears resolved")
+            # Wait a bit for cookies to settle
+            time.sleep(2)
+            break
+        
+        # Extract cookies
+        cookies_dict = {cookie['name']: cookie['value'] for cookie in context.cookies()}
+        
+        logger.info(f"Extracted {len(cookies_dict)} cookies")
     
     return cookies_dict
 
@@ -145,93 +439,88 @@ def create_session_with_cf_cookies(url, **kwargs):
     cookies = get_cf_cookies(url, **kwargs)
     
     session = requests.Session()
-    for name, value in cookies.items():
-        session.cookies.set(name, value)
+    session.cookies.update(cookies)
     
     return session
 
 
 # Async version for use with AsyncCloudScraper
-async def get_cf_cookies_async(url, timeout=30, headless=True, user_agent=None, advanced_stealth=True, behavioral_patterns=True):
+async def get_cf_cookies_async(url, timeout=30, headless=True, user_agent=None, advanced_stealth=True, behavioral_patterns=True,
+                               block_resources=True):
     """
     Async version of get_cf_cookies using Playwright's async API.
     """
     try:
-        from playwright.async_api import async_playwright
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
     except ImportError:
         raise ImportError(
             "Playwright is required for advanced Cloudflare bypass. "
             "Install it with: pip install playwright && playwright install chromium"
         )
     
-    from .stealth import StealthMode
     from .behavioral_simulation import InteractionSimulator
     
-    cookies_dict = {}
+    # Launch options
+    launch_args, init_script = _stealth_assets() if advanced_stealth else ((), None)
+    
+    context_options = {}
+    if user_agent:
+        context_options['user_agent'] = user_agent
     
-    async with async_playwright() as p:
-        # Launch options
-        launch_args = []
+    pool = get_playwright_pool()
+    async with pool.acquire_context_async(headless, launch_args, **context_options) as context:
+        if block_resources:
+            await context.route("**/*", _route_resources_async)
+        
         if advanced_stealth:
-            class DummyScraper:
-                def __init__(self):
-                    self.headers = {}
-            
-            stealth = StealthMode(DummyScraper())
-            launch_args = stealth.get_advanced_browser_args()
+            await context.add_init_script(init_script)
             
-        browser = await p.chromium.launch(headless=headless, args=launch_args)
+        page = await context.new_page()
         
-        context_options = {}
-        if user_agent:
-            context_options['user_agent'] = user_agent
+        logger.info(f"Navigating to {url} with Playwright (async)...")
         
-        context = await browser.new_context(**context_options)
+        await page.goto(url, wait_until='domcontentloaded', timeout=timeout * 1000)
         
-        if advanced_stealth:
-            await context.add_init_script(stealth.get_automation_bypass_script())
-            
-        page = await context.new_page()
+        simulator = InteractionSimulator() if behavioral_patterns else None
+        
+        # Interaction runs as its own task, so it never delays noticing
+        # that the challenge has cleared
+        interaction = asyncio.ensure_future(_interact_periodically(simulator, page)) if simulator else None
+        
+        deadline = time.monotonic() + timeout
+        poll_interval = CHALLENGE_POLL_INITIAL
         
         try:
-            logger.info(f"Navigating to {url} with Playwright (async)...")
-            
-            await page.goto(url, wait_until='domcontentloaded', timeout=timeout * 1000)
-            
-            simulator = InteractionSimulator() if behavioral_patterns else None
-            
-            import asyncio
-            start_time = time.time()
-            
-            while time.time() - start_time < timeout:
-                if simulator and random.random() < 0.2:
-                    await simulator.perform_human_interaction_async(page)
-                        
-                content = (await page.content()).lower()
-                
-                challenge_indicators = [
-                    'checking your browser',
-                    'just a moment',
-                    'please wait',
-                    'cf-challenge',
-                    'turnstile'
-                ]
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
                 
-                is_challenging = any(ind in content for ind in challenge_indicators)
+                wait = min(remaining, poll_interval)
+                try:
+                    await page.wait_for_function(
+                        CHALLENGE_CLEARED_JS,
+                        timeout=wait * 1000,
+                        polling=poll_interval * 1000
+                    )
+                except PlaywrightTimeoutError:
+                    poll_interval = min(poll_interval * CHALLENGE_POLL_BACKOFF, CHALLENGE_POLL_MAX)
+                    continue
                 
-                if not is_challenging:
-                    logger.info("Cloudflare challenge appears resolved")
-                    await asyncio.sleep(2)
-                    break
-                    
-                await asyncio.sleep(0.5)
-            
-            for cookie in await context.cookies():
-                cookies_dict[cookie['name']] = cookie['value']
-            
-            logger.info(f"Extracted {len(cookies_dict)} cookies")
-            
+                logger.info("Cloudflare challenge appears resolved")
+                # Wait a bit for cookies to settle
+                await asyncio.sleep(2)
+                break
         finally:
-            await browser.close()
+            if interaction:
+                interaction.cancel()
+                try:
+                    await interaction
+                except (asyncio.CancelledError, Exception):
+                    pass
+        
+        cookies_dict = {cookie['name']: cookie['value'] for cookie in await context.cookies()}
+        
+        logger.info(f"Extracted {len(cookies_dict)} cookies")
     
     return cookies_dict
@@ -1,11 +1,15 @@
+import heapq
 import random
 import logging
 import time
-from collections import defaultdict
 
 # ------------------------------------------------------------------------------- #
 
 
+def _new_proxy_stats():
+    return {'success': 0, 'failure': 0, 'last_used': 0}
+
+
 class ProxyManager:
     """
     A class to manage and rotate proxies for CloudScraper
@@ -23,8 +27,16 @@ class ProxyManager:
         self.current_index = 0
         self.rotation_strategy = proxy_rotation_strategy
         self.ban_time = ban_time
+        # Ban start times, from time.monotonic() so a wall clock adjustment
+        # never shortens or extends a ban. last_used in proxy_stats stays a
+        # time.time() epoch, as it is reported to callers.
         self.banned_proxies = {}
-        self.proxy_stats = defaultdict(lambda: {'success': 0, 'failure': 0, 'last_used': 0})
+        # Unbanned proxies in pool order, rebuilt only after a ban, unban or
+        # pool change instead of on every get_proxy call (None = rebuild)
+        self._available = None
+        # (banned_at, proxy) heap, so expired bans are found from the top;
+        # entries whose ban was lifted or renewed since are skipped
+        self._ban_expiry = []
         
         # Process the provided proxies
         if proxies:
@@ -37,6 +49,10 @@ class ProxyManager:
                         self.proxies.append(proxy)
             elif isinstance(proxies, str):
                 self.proxies = [proxies]
+        
+        # Stats entries of pool proxies are created up front, so lookups
+        # are plain dict reads
+        self.proxy_stats = {proxy: _new_proxy_stats() for proxy in self.proxies}
                 
         logging.debug(f"ProxyManager initialized with {len(self.proxies)} proxies using '{proxy_rotation_strategy}' strategy")
 
@@ -52,8 +68,7 @@ class ProxyManager:
             return None
             
         # Filter out banned proxies
-        available_proxies = [p for p in self.proxies if p not in self.banned_proxies or 
-                            time.time() - self.banned_proxies[p] > self.ban_time]
+        available_proxies = self._available_proxies()
         
         if not available_proxies:
             logging.warning("All proxies are currently banned. Using the least recently banned one.")
@@ -61,6 +76,7 @@ class ProxyManager:
             proxy = min(self.banned_proxies.items(), key=lambda x: x[1])[0]
             # Reset its ban time
             self.banned_proxies.pop(proxy)
+            self._available = None
             return self._format_proxy(proxy)
         
         # Choose a proxy based on the strategy
@@ -83,12 +99,35 @@ class ProxyManager:
             self.current_index += 1
             
         # Update last used time
-        self.proxy_stats[proxy]['last_used'] = time.time()
+        self._get_stats(proxy)['last_used'] = time.time()
         
         return self._format_proxy(proxy)
 
     # ------------------------------------------------------------------------------- #
 
+    def _available_proxies(self):
+        """
+        Get the proxies that are not banned, or whose ban has expired
+        
+        :return: List of proxy URLs in pool order
+        """
+        current_time = time.monotonic()
+        
+        # A ban running out makes its proxy available again
+        ban_expiry = self._ban_expiry
+        while ban_expiry and current_time - ban_expiry[0][0] > self.ban_time:
+            banned_at, proxy = heapq.heappop(ban_expiry)
+            if self.banned_proxies.get(proxy) == banned_at:
+                self._available = None
+        
+        if self._available is None:
+            self._available = [p for p in self.proxies if p not in self.banned_proxies or
+                               current_time - self.banned_proxies[p] > self.ban_time]
+        
+        return self._available
+
+    # ------------------------------------------------------------------------------- #
+
     def _format_proxy(self, proxy):
         """
         Format the proxy as a dict for requests
@@ -116,9 +155,10 @@ class ProxyManager:
             proxy_url = proxy
             
         if proxy_url:
-            self.proxy_stats[proxy_url]['success'] += 1
+            self._get_stats(proxy_url)['success'] += 1
             if proxy_url in self.banned_proxies:
                 del self.banned_proxies[proxy_url]
+                self._available = None
 
     # ------------------------------------------------------------------------------- #
 
@@ -135,19 +175,35 @@ class ProxyManager:
             proxy_url = proxy
             
         if proxy_url:
-            self.proxy_stats[proxy_url]['failure'] += 1
-            self.banned_proxies[proxy_url] = time.time()
+            self._get_stats(proxy_url)['failure'] += 1
+            banned_at = time.monotonic()
+            self.banned_proxies[proxy_url] = banned_at
+            heapq.heappush(self._ban_expiry, (banned_at, proxy_url))
+            self._available = None
 
     # ------------------------------------------------------------------------------- #
 
-    def _calculate_proxy_score(self, proxy_url):
+    def _get_stats(self, proxy_url):
+        """
+        Get the stats entry of a proxy, creating it for a proxy outside the pool
+        
+        :param proxy_url: The proxy URL
+        :return: Dict with 'success', 'failure' and 'last_used'
+        """
+        stats = self.proxy_stats.get(proxy_url)
+        if stats is None:
+            stats = self.proxy_stats[proxy_url] = _new_proxy_stats()
+        return stats
+
+    def _calculate_proxy_score(self, proxy_url, current_time=None):
         """
         Calculate a score for proxy selection in smart mode
 
         :param proxy_url: The proxy URL to score
+        :param current_time: Time to score at, to share one reading across proxies
         :return: Score (higher is better)
         """
-        stats = self.proxy_stats[proxy_url]
+        stats = self._get_stats(proxy_url)
         total_requests = stats['success'] + stats['failure']
 
         if total_requests == 0:
@@ -158,7 +214,9 @@ class ProxyManager:
         success_rate = stats['success'] / total_requests
 
         # Recency component (prefer less recently used proxies)
-        time_since_last_use = time.time() - stats['last_used']
+        if current_time is None:
+            current_time = time.time()
+        time_since_last_use = current_time - stats['last_used']
         recency_score = min(time_since_last_use / 300, 1.0)  # Normalize to 5 minutes
 
         # Combine scores (weighted)
@@ -174,25 +232,15 @@ class ProxyManager:
         if not available_proxies:
             return None
 
-        weights = []
-        for proxy in available_proxies:
-            score = self._calculate_proxy_score(proxy)
-            weights.append(max(score, 0.1))  # Minimum weight to give all proxies a chance
-
-        # Weighted random selection
-        total_weight = sum(weights)
-        if total_weight == 0:
-            return random.choice(available_proxies)
-
-        r = random.uniform(0, total_weight)
-        cumulative_weight = 0
-
-        for i, weight in enumerate(weights):
-            cumulative_weight += weight
-            if r <= cumulative_weight:
-                return available_proxies[i]
+        # Scores change with time since last use, so they are computed
+        # afresh, with a minimum weight to give all proxies a chance
+        current_time = time.time()
+        weights = [max(self._calculate_proxy_score(proxy, current_time), 0.1)
+                   for proxy in available_proxies]
 
-        return available_proxies[-1]  # Fallback
+        # Weighted random selection; random.choices accumulates the weights
+        # and bisects them in C
+        return random.choices(available_proxies, weights)[0]
 
     def _smart_round_robin(self, available_proxies):
         """
@@ -205,17 +253,17 @@ class ProxyManager:
             return None
 
         # Filter out proxies that failed recently
-        current_time = time.time()
+        current_time = time.monotonic()
         good_proxies = []
 
         for proxy in available_proxies:
-            stats = self.proxy_stats[proxy]
+            stats = self._get_stats(proxy)
             if stats['failure'] == 0:
                 good_proxies.append(proxy)
             else:
                 # Check if enough time has passed since last failure
-                time_since_failure = current_time - self.banned_proxies.get(proxy, 0)
-                if time_since_failure > 60:  # 1 minute cooldown
+                banned_at = self.banned_proxies.get(proxy)
+                if banned_at is None or current_time - banned_at > 60:  # 1 minute cooldown
                     good_proxies.append(proxy)
 
         # Use good proxies if available, otherwise fall back to all available
@@ -242,10 +290,10 @@ class ProxyManager:
             'proxy_details': {}
         }
 
-        current_time = time.time()
+        current_time = time.monotonic()
 
         for proxy in self.proxies:
-            stats = self.proxy_stats[proxy]
+            stats = self._get_stats(proxy)
             total_requests = stats['success'] + stats['failure']
             success_rate = (stats['success'] / total_requests) if total_requests > 0 else 0
 
@@ -280,6 +328,8 @@ class ProxyManager:
         """
         if proxy not in self.proxies:
             self.proxies.append(proxy)
+            self._get_stats(proxy)
+            self._available = None
             logging.debug(f"Added proxy: {proxy}")
 
     # ------------------------------------------------------------------------------- #
@@ -296,6 +346,7 @@ class ProxyManager:
                 del self.banned_proxies[proxy]
             if proxy in self.proxy_stats:
                 del self.proxy_stats[proxy]
+            self._available = None
             logging.debug(f"Removed proxy: {proxy}")
 
     # ------------------------------------------------------------------------------- #
@@ -308,8 +359,7 @@ class ProxyManager:
         """
         return {
             'total_proxies': len(self.proxies),
-            'available_proxies': len([p for p in self.proxies if p not in self.banned_proxies or 
-                                     time.time() - self.banned_proxies[p] > self.ban_time]),
+            'available_proxies': len(self._available_proxies()),
             'banned_proxies': len(self.banned_proxies),
             'proxy_stats': dict(self.proxy_stats)
         }
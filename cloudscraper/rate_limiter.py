@@ -29,12 +29,22 @@ class SmartRateLimiter:
         self.burst_limit = burst_limit
         self.burst_window = burst_window
         
-        # Per-domain tracking
-        self.delays: Dict[str, float] = defaultdict(lambda: default_delay)
+        # Per-domain tracking. Domains get their delay and history entries
+        # from _ensure_domain() when first seen, and reads fall back to the
+        # defaults, so no lookup goes through a Python default factory.
+        self.delays: Dict[str, float] = {}
         self.last_request_time: Dict[str, float] = {}
-        self.request_history: Dict[str, deque] = defaultdict(lambda: deque(maxlen=burst_limit))
+        self.request_history: Dict[str, deque] = {}
         self.rate_limit_hits: Dict[str, int] = defaultdict(int)
     
+    def _ensure_domain(self, domain: str) -> deque:
+        """Get the domain's request history, setting up its tracking if it is new"""
+        history = self.request_history.get(domain)
+        if history is None:
+            history = self.request_history[domain] = deque(maxlen=self.burst_limit)
+            self.delays.setdefault(domain, self.default_delay)
+        return history
+    
     def wait_if_needed(self, domain: str):
         """
         Wait if necessary to respect rate limits
@@ -42,10 +52,10 @@ class SmartRateLimiter:
         Args:
             domain: Domain name
         """
-        current_time = time.time()
+        current_time = time.monotonic()
         
         # Check burst limit
-        history = self.request_history[domain]
+        history = self._ensure_domain(domain)
         if len(history) >= self.burst_limit:
             oldest_request = history[0]
             time_since_oldest = current_time - oldest_request
@@ -54,7 +64,7 @@ class SmartRateLimiter:
                 # Burst limit hit, wait
                 wait_time = self.burst_window - time_since_oldest
                 time.sleep(wait_time)
-                current_time = time.time()
+                current_time = time.monotonic()
         
         # Check minimum delay
         if domain in self.last_request_time:
@@ -64,11 +74,11 @@ class SmartRateLimiter:
             if time_since_last < delay:
                 wait_time = delay - time_since_last
                 time.sleep(wait_time)
-                current_time = time.time()
+                current_time = time.monotonic()
         
         # Record this request
         self.last_request_time[domain] = current_time
-        self.request_history[domain].append(current_time)
+        history.append(current_time)
     
     def record_rate_limit(self, domain: str):
         """
@@ -81,7 +91,7 @@ class SmartRateLimiter:
         self.rate_limit_hits[domain] += 1
         
         # Exponentially increase delay
-        current_delay = self.delays[domain]
+        current_delay = self.delays.get(domain, self.default_delay)
         new_delay = min(current_delay * 2, self.max_delay)
         self.delays[domain] = new_delay
     
@@ -94,7 +104,7 @@ class SmartRateLimiter:
             domain: Domain name
         """
         # Gradually decrease delay on success
-        current_delay = self.delays[domain]
+        current_delay = self.delays.get(domain, self.default_delay)
         
         if current_delay > self.default_delay:
             # Decrease by 10%
@@ -103,7 +113,7 @@ class SmartRateLimiter:
     
     def get_delay(self, domain: str) -> float:
         """Get current delay for domain"""
-        return self.delays[domain]
+        return self.delays.get(domain, self.default_delay)
     
     def reset_domain(self, domain: str):
         """Reset rate limit tracking for domain"""
@@ -117,7 +127,7 @@ class SmartRateLimiter:
     def get_stats(self, domain: str) -> Dict:
         """Get statistics for domain"""
         return {
-            'current_delay': self.delays[domain],
+            'current_delay': self.delays.get(domain, self.default_delay),
             'rate_limit_hits': self.rate_limit_hits[domain],
-            'recent_requests': len(self.request_history[domain])
+            'recent_requests': len(self.request_history.get(domain, ()))
         }